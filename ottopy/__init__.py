@@ -4,11 +4,41 @@
 # Copyright (c) Indresh Vishwakarma.
 # Distributed under the terms of the Modified BSD License.
 
-from .maze import Maze
+"""
+ottopy: a configurable maze library.
+
+The Jupyter widget layer (`Maze`, `get_robo_builder`) is imported on first
+use, so ``import ottopy`` and the pure simulation API of `ottopy.sim` load
+without ipywidgets, traitlets, IPython or ipykernel and print nothing.
+"""
+
+import importlib
+
+from .headless import HeadlessMaze
 from .models import *
-from .lib import get_robo_builder
 from ._version import __version__, version_info
-print(f"ottopy version: {__version__}")
+
+# names loaded from their module on first access, see PEP 562
+_lazy = {
+    'AsyncRobot': '.async_robot',
+    'Maze': '.maze',
+    'Scheduler': '.scheduler',
+    'get_robo_builder': '.lib',
+}
+
+
+def __getattr__(name):
+    module = _lazy.get(name, None)
+    if module is None:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy))
 
 
 def _jupyter_labextension_paths():
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Opt-in access to comm messages that arrive while a cell is still running.
+
+The kernel only handles shell messages once the running cell is finished, so
+acks written by the frontend (``method_return``) wait in the shell queue behind
+the cell that triggered them. `dispatch_comm_msgs` can hand those comm messages
+to the comm manager right away, but only by reaching into private ipykernel 6
+internals, so it is off unless enabled with `enable_comm_dispatch` or the
+``OTTOPY_COMM_DISPATCH=1`` environment variable. Without it the frontend is
+heard from between cells, through the regular comm handling. All knowledge of
+ipykernel internals lives here.
+"""
+
+import os
+
+COMM_MSG_TYPES = ("comm_msg",)
+# major ipykernel versions whose shell queue layout is known
+SUPPORTED_IPYKERNEL = (6,)
+
+
+def enable_comm_dispatch(enabled=True):
+    """Lets `dispatch_comm_msgs` dispatch the comm messages queued behind a
+    running cell, so waits and the flow control hear the frontend at once.
+
+    Returns
+    -------
+    bool
+        whether it is enabled: False when the running ipykernel is not a
+        supported version.
+    """
+    global _enabled
+    _enabled = bool(enabled) and supported_ipykernel()
+    return _enabled
+
+
+def supported_ipykernel():
+    try:
+        import ipykernel
+    except ImportError:
+        return False
+    return ipykernel.version_info[0] in SUPPORTED_IPYKERNEL
+
+
+_enabled = os.environ.get("OTTOPY_COMM_DISPATCH", "") == "1" and \
+    supported_ipykernel()
+
+
+def get_kernel():
+    try:
+        from IPython import get_ipython
+    except ImportError:
+        return None
+    return getattr(get_ipython(), "kernel", None)
+
+
+def dispatch_comm_msgs():
+    """Dispatches the comm messages queued behind the running cell.
+
+    Returns
+    -------
+    int or None
+        number of dispatched messages, None when it is not enabled or the
+        current kernel does not expose its shell queue (no kernel, or an
+        unsupported ipykernel).
+    """
+    if not _enabled:
+        return None
+    kernel = get_kernel()
+    msg_queue = getattr(kernel, "msg_queue", None)
+    pending = getattr(msg_queue, "_queue", None)
+    if pending is None:
+        return None
+
+    try:
+        kernel.shell_stream.flush()
+        # peek with a cloned session so messages left in the queue can still
+        # be deserialized by the kernel (signatures are only accepted once)
+        session = kernel.session.clone()
+        dispatched = 0
+        for item in list(pending):
+            (_, _, args) = item
+            idents, msg = session.feed_identities(args[0], copy=False)
+            msg = session.deserialize(msg, content=True, copy=False)
+            msg_type = msg.get("msg_type", "")
+            if msg_type not in COMM_MSG_TYPES:
+                continue
+
+            handler = kernel.shell_handlers.get(msg_type, None)
+            if handler is None:
+                continue
+            pending.remove(item)
+            handler(kernel.shell_stream, idents, msg)
+            dispatched += 1
+        return dispatched
+    except Exception:
+        return None
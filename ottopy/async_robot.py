@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Asyncio robot API.
+
+`AsyncRobot` wraps a `Robot`. Actions update the world at once, like the
+blocking API, then await the ``method_return`` ack of the call they sent to
+the view, so the animation is paced by the frontend without blocking the
+kernel: other cells and the robots of other mazes run meanwhile, and
+cancelling the task running a program stops it at the next action and halts
+the view. Sensors are answered by the world model and are not awaited.
+
+Acks are only awaited with comm dispatch enabled (see
+`_kernel.enable_comm_dispatch`). Without it they can not arrive while a cell
+is running, so actions await the fixed pacing of the flow control instead.
+
+Examples
+--------
+>>> bot = AsyncRobot(maze.bot())
+>>> async def run():
+...     while await bot.move_until_blocked() == 0 and not bot.done():
+...         await bot.turn_left()
+>>> task = asyncio.ensure_future(run())
+"""
+
+import asyncio
+
+from .flow_control import wait_for_async
+
+
+class AsyncRobot():
+    """Awaitable counterpart of a `Robot`.
+
+    Parameters
+    ----------
+    robot : Robot
+        robot to drive, of a `Maze` or of a `HeadlessMaze`.
+    timeout : float
+        seconds to wait for an ack before going on, as if the frontend had
+        dropped the call. The ack timeout of the maze flow control when None.
+    """
+
+    def __init__(self, robot, timeout=None):
+        self.robot = robot
+        self.world = robot.world
+        self.timeout = timeout
+
+    def __getattr__(self, name):
+        # sensors and properties of the wrapped robot
+        return getattr(self.robot, name)
+
+    async def sync(self):
+        """Waits until the view has executed every call sent so far.
+
+        Returns
+        -------
+        bool
+            False when no ack came in time, or right away when acks can not
+            be received.
+        """
+        maze = self.world
+        cb = getattr(maze, 'last_cb', None)
+        if cb is None or not hasattr(maze, 'expect_ack'):
+            # nothing sent, or a headless maze
+            return True
+
+        maze.flush()
+        if maze.flow.can_receive is None:
+            maze.flow.receive()
+        if not maze.flow.can_receive:
+            # acks only arrive between cells, the actions are paced instead
+            return False
+        timeout = self.timeout
+        if timeout is None:
+            timeout = maze.flow.ack_timeout
+        try:
+            return await wait_for_async(maze.expect_ack(cb), timeout)
+        except asyncio.CancelledError:
+            maze.halt()
+            raise
+
+    async def _act(self, action, *args):
+        flow = getattr(self.world, 'flow', None)
+        if flow is None:
+            # a headless maze
+            return action(*args)
+
+        # the credit is awaited here, the frames of the action must not
+        # block the event loop in `CreditWindow.acquire`
+        await flow.acquire_async()
+        flow.blocking = False
+        try:
+            result = action(*args)
+        finally:
+            flow.blocking = True
+        await self.sync()
+        return result
+
+    async def move(self, step=1):
+        """Awaitable `Robot.move`.
+
+        Examples
+        --------
+        >>> await bot.move(2)
+        """
+        return await self._act(self.robot.move, step)
+
+    async def move_until_blocked(self):
+        """Awaitable `Robot.move_until_blocked`, returns the cells moved."""
+        return await self._act(self.robot.move_until_blocked)
+
+    async def turn_left(self):
+        """Awaitable `Robot.turn_left`."""
+        return await self._act(self.robot.turn_left)
+
+    async def take(self, obj_type=None):
+        """Awaitable `Robot.take`."""
+        return await self._act(self.robot.take, obj_type)
+
+    async def put(self):
+        """Awaitable `Robot.put`."""
+        return await self._act(self.robot.put)
+
+    async def build_wall(self):
+        """Awaitable `Robot.build_wall`."""
+        return await self._act(self.robot.build_wall)
+
+    async def remove_wall(self):
+        """Awaitable `Robot.remove_wall`."""
+        return await self._act(self.robot.remove_wall)
+
+    async def read_message(self, wait_For=5):
+        """Awaitable `Robot.read_message`, returns the message."""
+        return await self._act(self.robot.read_message, wait_For)
+
+    async def set_trace(self, color='red'):
+        """Awaitable `Robot.set_trace`."""
+        return await self._act(self.robot.set_trace, color)
+
+    async def set_speed(self, speed=0.1):
+        """Awaitable `Robot.set_speed`."""
+        return await self._act(self.robot.set_speed, speed)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Event bus of the world mutations shown by a frontend.
+
+Every call a maze makes for its view (move, turn, walls, objects, flags,
+messages, ...) becomes one `Event` published on the `EventBus` of the maze.
+Sinks subscribed to the bus receive it: the widget transport, the HTML
+replay, trace recorders, `EventMetrics`. An event is encoded to JSON at most
+once, on first use, and the same text is handed to every sink that needs
+it, so a new sink does not add an encoding per action.
+"""
+
+import json
+
+
+class Event():
+    """One frontend call: ``method_name``, ``params`` and the ``cb``,
+    ``stats`` and ``ui_id`` the maze adds, as the `data` dict."""
+
+    __slots__ = ("data", "text")
+
+    def __init__(self, data):
+        self.data = data
+        self.text = None
+
+    @property
+    def method_name(self):
+        return self.data["method_name"]
+
+    @property
+    def params(self):
+        return self.data["params"]
+
+    def encode(self):
+        """Compact JSON text of the event, computed once."""
+        if self.text is None:
+            self.text = json.dumps(self.data, separators=(',', ':'))
+        return self.text
+
+
+def encode_frame(events):
+    """JSON text of a frame of several events, reusing their encodings."""
+    return "[" + ",".join(event.encode() for event in events) + "]"
+
+
+class EventBus():
+    """Fans the events of a maze out to its sinks, callables taking an
+    `Event`, in subscription order."""
+
+    def __init__(self):
+        self.sinks = []
+
+    def subscribe(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def unsubscribe(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def emit(self, event):
+        for sink in self.sinks:
+            sink(event)
+
+
+class EventMetrics():
+    """Sink counting the events and their encoded size by method.
+
+    Examples
+    --------
+    >>> metrics = maze.events.subscribe(EventMetrics())
+    >>> bot.move()
+    >>> metrics.report()
+    {'events': 1, 'bytes': 98, 'methods': {'move_to': {'count': 1, 'bytes': 98}}}
+    """
+
+    def __init__(self):
+        self.methods = {}
+
+    def __call__(self, event):
+        size = len(event.encode())
+        entry = self.methods.get(event.method_name, None)
+        if entry is None:
+            entry = self.methods[event.method_name] = [0, 0]
+        entry[0] += 1
+        entry[1] += size
+
+    def report(self):
+        return {
+            "events": sum(count for count, _ in self.methods.values()),
+            "bytes": sum(size for _, size in self.methods.values()),
+            "methods": {name: {"count": count, "bytes": size}
+                        for name, (count, size) in sorted(self.methods.items())},
+        }
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Ack based flow control between `Maze` and its frontend view, and waiting on
+the frontend while a cell is running.
+
+Acks written during a running cell can only be read with comm dispatch
+enabled (see `_kernel.enable_comm_dispatch`), which is off by default: by
+default a running cell is still paced by the fixed throttle of
+`CreditWindow.pace`.
+"""
+
+import asyncio
+import time as _time
+from collections import OrderedDict
+
+from ._kernel import dispatch_comm_msgs, get_kernel
+
+
+def wait_for(future, timeout, poll_interval=0.01):
+    """Waits up to `timeout` seconds for `future`, resolved by a handler of
+    frontend messages, handing the comm messages queued behind the running
+    cell to their handlers meanwhile.
+
+    When they can not be dispatched (see `_kernel.enable_comm_dispatch`)
+    nothing can arrive before the cell ends, so it returns at once.
+
+    Returns
+    -------
+    bool
+        True when `future` is resolved.
+    """
+    deadline = _time.monotonic() + timeout
+    while not future.done():
+        if dispatch_comm_msgs() is None:
+            return future.done()
+        if future.done():
+            break
+        if _time.monotonic() >= deadline:
+            return False
+        _time.sleep(poll_interval)
+    return True
+
+
+async def wait_for_async(future, timeout=None, poll_interval=0.01):
+    """Awaitable `wait_for`: yields to the event loop between dispatches, so
+    other tasks, like the robots of other mazes, run meanwhile. Outside of
+    a running cell the kernel dispatches the messages itself.
+
+    Returns
+    -------
+    bool
+        True when `future` is resolved, False after `timeout` seconds.
+    """
+    deadline = None if timeout is None else _time.monotonic() + timeout
+    while not future.done():
+        dispatch_comm_msgs()
+        if future.done():
+            break
+        if deadline is not None and _time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(poll_interval)
+    return True
+
+
+class CreditWindow():
+    """Limits the number of frames the frontend has not acknowledged yet.
+
+    Every frame sent to the view is registered with `sent` and released when
+    the matching ``method_return`` ack comes back through `ack`. `acquire`
+    only looks for acks, and blocks, once `window` frames are in flight.
+    The view acks failed calls too, with an ``error``. The window grows by one
+    frame per ack while the smoothed ack latency stays below `target_latency`
+    and is halved (at most once per latency period) when it goes above, so
+    fast frontends run unthrottled and slow ones get backpressure.
+
+    This only applies with comm dispatch enabled. By default, and when acks
+    can not be received during a running cell (no kernel, or an unsupported
+    ipykernel), it falls back to the fixed pacing of sleeping
+    `fallback_sleep` seconds every `fallback_every` frames, like before the
+    window existed; outside of a kernel it does not wait at all.
+    """
+
+    def __init__(self, window=4, min_window=1, max_window=64,
+                 target_latency=1.0, ack_timeout=5.0, poll_interval=0.01,
+                 fallback_every=10, fallback_sleep=0.5):
+        self.window = window
+        self.min_window = min_window
+        self.max_window = max_window
+        self.target_latency = target_latency
+        self.ack_timeout = ack_timeout
+        self.poll_interval = poll_interval
+        self.fallback_every = fallback_every
+        self.fallback_sleep = fallback_sleep
+
+        self.in_flight = OrderedDict()
+        self.latency = None
+        self.last_decrease = 0
+        self.can_receive = None
+        self.paced = 0
+        # False while an `AsyncRobot` action that already awaited its credit
+        # sends its frames
+        self.blocking = True
+
+    def acquire(self):
+        """Blocks until one more frame may be sent. The pending comm
+        messages are only looked at once the window is exhausted."""
+        if not self.blocking:
+            return
+        if self.can_receive is False:
+            return self.pace()
+        if len(self.in_flight) < self.window:
+            return
+
+        self.receive()
+        if not self.can_receive:
+            # acks only arrive between cells, frames are no longer counted
+            self.in_flight.clear()
+            return self.pace()
+        if len(self.in_flight) < self.window:
+            return
+
+        started = _time.monotonic()
+        while len(self.in_flight) >= self.window:
+            if _time.monotonic() - started > self.ack_timeout:
+                # the oldest frame was dropped by the frontend
+                self.in_flight.popitem(last=False)
+                self.decrease(_time.monotonic())
+                return
+            _time.sleep(self.poll_interval)
+            self.receive()
+
+    async def acquire_async(self):
+        """Awaitable `acquire`, yielding to the event loop while the window
+        is exhausted instead of blocking it. Without acks to wait for, it
+        awaits the fixed pacing of `pace_async`."""
+        if self.can_receive is None:
+            self.receive()
+        if not self.can_receive:
+            self.in_flight.clear()
+            return await self.pace_async()
+        if len(self.in_flight) < self.window:
+            return
+
+        started = _time.monotonic()
+        self.receive()
+        while self.can_receive and len(self.in_flight) >= self.window:
+            if _time.monotonic() - started > self.ack_timeout:
+                # the oldest frame was dropped by the frontend
+                self.in_flight.popitem(last=False)
+                self.decrease(_time.monotonic())
+                return
+            await asyncio.sleep(self.poll_interval)
+            self.receive()
+
+    def receive(self):
+        self.can_receive = dispatch_comm_msgs() is not None
+
+    def pace(self):
+        if self._should_sleep():
+            _time.sleep(self.fallback_sleep)
+
+    async def pace_async(self):
+        """Awaitable `pace`."""
+        if self._should_sleep():
+            await asyncio.sleep(self.fallback_sleep)
+
+    def _should_sleep(self):
+        if get_kernel() is None:
+            # no kernel, no view to keep up with
+            return False
+        self.paced += 1
+        return self.paced % self.fallback_every == 0
+
+    def sent(self, cb):
+        if self.can_receive is False:
+            return
+        self.in_flight[cb] = _time.monotonic()
+
+    def ack(self, cb):
+        """Releases the frame `cb` and every frame sent before it."""
+        if cb not in self.in_flight:
+            return
+
+        now = _time.monotonic()
+        while len(self.in_flight) > 0:
+            key, sent_at = self.in_flight.popitem(last=False)
+            if key == cb:
+                break
+
+        latency = now - sent_at
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = 0.8 * self.latency + 0.2 * latency
+
+        if self.latency > self.target_latency:
+            self.decrease(now)
+        else:
+            self.window = min(self.max_window, self.window + 1)
+
+    def decrease(self, now):
+        if now - self.last_decrease >= (self.latency or 0):
+            self.window = max(self.min_window, self.window // 2)
+            self.last_decrease = now
+
+    def reset(self):
+        """Forgets the frames in flight, e.g. after the frontend was halted."""
+        self.in_flight.clear()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Batch grading of student programs against a level.
+
+Every submission is a Python file run with a headless ``bot`` in its globals,
+the same object `get_robo_builder` hands out in a notebook. Submissions are
+spread over a process pool; each one runs under a wall-clock limit and a hard
+instruction limit so a runaway loop can not stall its worker. Passing
+submissions are scored on efficiency against the optimal instruction count
+of the level computed by `ottopy.solver`.
+
+Command line::
+
+    python -m ottopy.grader level1 submissions/ -j 8 -o results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time as _time
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+
+from .headless import HeadlessMaze
+from .models.levels import load_config, load_template, load_world
+from .models.world_parser import VariantRandom
+from .solver import efficiency, optimal_instructions
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_MAX_INSTRUCTIONS = 10000
+
+_optimal = {}
+
+
+class SubmissionTimeout(BaseException):
+    # not an Exception, so `except Exception` in a submission can not swallow it
+    pass
+
+
+def level_path(level, worlds_dir="worlds"):
+    """Resolves a level name the way `get_robo_builder` does."""
+    if level.endswith(".json") or os.path.exists(level):
+        return level
+    return os.path.join(worlds_dir, "{}.json".format(level))
+
+
+def build_world(path, max_instructions=DEFAULT_MAX_INSTRUCTIONS, variant=None,
+                profile=False):
+    # every worker reads and parses a level file only once, and a variant
+    # only once
+    options = {'MAX_INSTRUCTION_COUNT': max_instructions,
+               'INSTRUCTION_LIMIT': max_instructions,
+               'profile': profile}
+    if variant is not None:
+        return load_template(path, variant).instantiate(None, options)
+    # the random draws are recorded, they identify the world drawn
+    options['rng'] = VariantRandom(random.getrandbits(32))
+    return load_world(path, None, options)
+
+
+def level_optimum(path, world, variant=None):
+    # the optimal count is shared by every submission graded on the same
+    # world: the same variant, or the same draws of a random level
+    if variant is not None:
+        key = (path, variant["seed"], tuple(variant["choices"]))
+    else:
+        key = (path, tuple(world.options['rng'].picked))
+    if key not in _optimal:
+        _optimal[key] = optimal_instructions(world)
+    return _optimal[key]
+
+
+def _on_timeout(signum, frame):
+    raise SubmissionTimeout()
+
+
+@contextlib.contextmanager
+def time_limit(seconds, filename=None):
+    """Raises `SubmissionTimeout` in the block after `seconds`.
+
+    On the main thread a SIGALRM timer interrupts it. Signals only reach
+    the main thread, so elsewhere (thread pools, web handlers) a trace
+    function checks the deadline: on every line of the code compiled from
+    `filename`, and on every function call.
+    """
+    if seconds is None:
+        yield
+        return
+    if not hasattr(signal, "setitimer") or \
+            threading.current_thread() is not threading.main_thread():
+        with trace_deadline(seconds, filename):
+            yield
+        return
+
+    previous = signal.signal(signal.SIGALRM, _on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@contextlib.contextmanager
+def trace_deadline(seconds, filename=None):
+    deadline = _time.monotonic() + seconds
+
+    def check_line(frame, event, arg):
+        if _time.monotonic() > deadline:
+            raise SubmissionTimeout()
+        return check_line
+
+    def check_call(frame, event, arg):
+        if _time.monotonic() > deadline:
+            raise SubmissionTimeout()
+        if filename is not None and frame.f_code.co_filename == filename:
+            return check_line
+        return None
+
+    previous = sys.gettrace()
+    sys.settrace(check_call)
+    try:
+        yield
+    finally:
+        sys.settrace(previous)
+
+
+def run_program(world, source, filename="<submission>", timeout=DEFAULT_TIMEOUT):
+    """Runs `source` against the first robot of `world`.
+
+    Returns
+    -------
+    dict
+        per goal results, instruction and move counts, the error that
+        stopped the program if any, and the ``profile`` of the robot when
+        the world has the ``profile`` option.
+    """
+    maze = HeadlessMaze(world)
+    bot = maze.bot()
+    error = None
+    started = _time.perf_counter()
+    try:
+        code = compile(source, filename, "exec")
+        with contextlib.redirect_stdout(io.StringIO()), \
+                time_limit(timeout, filename):
+            exec(code, {"__name__": "__main__", "bot": bot})
+    except SubmissionTimeout:
+        error = "Timeout: exceeded {}s".format(timeout)
+    except BaseException as e:
+        error = "{}: {}".format(type(e).__name__, e)
+    elapsed = _time.perf_counter() - started
+
+    goals = world.goal_results(bot)
+    result = {
+        "passed": error is None and all(g["completed"] for g in goals),
+        "goals": goals,
+        "instructions": world.instruction_count,
+        "moves": bot.move_count,
+        "error": error,
+        "elapsed": elapsed,
+    }
+    profile = bot.stats.profile()
+    if profile is not None:
+        result["profile"] = profile
+    return result
+
+
+def grade_submission(job):
+    """Grades one submission, `job` being a dict with the level path,
+    program path, timeout and instruction limit, and optionally the world
+    `variant` to build. Runs in pool workers."""
+    result = {"submission": job["program"]}
+    variant = job.get("variant", None)
+    if variant is not None:
+        result["variant"] = variant
+    try:
+        with open(job["program"], "r") as f:
+            source = f.read()
+        world = build_world(job["level"], job["max_instructions"], variant,
+                            job.get("profile", False))
+    except Exception as e:
+        result.update({"passed": False, "goals": [], "instructions": 0,
+                       "moves": 0, "error": "{}: {}".format(type(e).__name__, e),
+                       "elapsed": 0.0, "optimal": None, "efficiency": None})
+        return result
+
+    if variant is not None:
+        result["start"] = [[r.x, r.y, r.orientation] for r in world.robots]
+    # the solver runs under the same guard as the submissions
+    optimal = None
+    try:
+        with time_limit(job["timeout"]):
+            optimal = level_optimum(job["level"], world, variant)
+    except SubmissionTimeout:
+        result["optimal_error"] = "Timeout: exceeded {}s".format(
+            job["timeout"])
+    except Exception as e:
+        result["optimal_error"] = "{}: {}".format(type(e).__name__, e)
+    result.update(run_program(world, source, job["program"], job["timeout"]))
+    result["optimal"] = optimal
+    result["efficiency"] = efficiency(optimal, result["instructions"]) \
+        if result["passed"] else None
+    return result
+
+
+def find_submissions(submissions):
+    if isinstance(submissions, str):
+        return sorted(glob(os.path.join(submissions, "*.py")))
+    return list(submissions)
+
+
+def grade(level, submissions, processes=None, timeout=DEFAULT_TIMEOUT,
+          max_instructions=DEFAULT_MAX_INSTRUCTIONS, worlds_dir="worlds",
+          chunksize=None, profile=False):
+    """Grades many submissions against a level in a process pool.
+
+    Parameters
+    ----------
+    level : str
+        level name (looked up as ``{worlds_dir}/{level}.json``) or path.
+    submissions : str or list
+        directory of ``.py`` files, or a list of file paths.
+    processes : int
+        pool size, defaults to the number of cores.
+    profile : bool
+        add the `ottopy.profiler` report of every run as ``profile``.
+
+    Returns
+    -------
+    list
+        one result dict per submission, in submission order.
+
+    Examples
+    --------
+    >>> results = grade("level1", "submissions/")
+    >>> sum(r["passed"] for r in results)
+    42
+    """
+    path = level_path(level, worlds_dir)
+    jobs = [{"level": path, "program": program, "timeout": timeout,
+             "max_instructions": max_instructions, "profile": profile}
+            for program in find_submissions(submissions)]
+    return run_jobs(jobs, processes, chunksize)
+
+
+def run_jobs(jobs, processes=None, chunksize=None):
+    if len(jobs) == 0:
+        return []
+    if processes == 1:
+        return [grade_submission(job) for job in jobs]
+
+    processes = processes or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(grade_submission, jobs, chunksize=chunksize))
+
+
+def summary(results):
+    passed = sum(1 for r in results if r["passed"])
+    return {"submissions": len(results), "passed": passed,
+            "failed": len(results) - passed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="ottopy-grade",
+        description="Grade student programs against an ottopy level.")
+    parser.add_argument("level", help="level name or path of a level json file")
+    parser.add_argument("submissions", help="directory of .py submissions")
+    parser.add_argument("-j", "--processes", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="wall-clock limit per submission, in seconds")
+    parser.add_argument("--max-instructions", type=int,
+                        default=DEFAULT_MAX_INSTRUCTIONS)
+    parser.add_argument("--worlds-dir", default="worlds")
+    parser.add_argument("--profile", action="store_true",
+                        help="add call counts, timings and cell visits")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the json report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = grade(args.level, args.submissions, processes=args.processes,
+                    timeout=args.timeout,
+                    max_instructions=args.max_instructions,
+                    worlds_dir=args.worlds_dir, profile=args.profile)
+    report = {"level": args.level, "summary": summary(results),
+              "results": results}
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
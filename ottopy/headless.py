@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Headless simulation backend.
+
+`HeadlessMaze` stands in for the `Maze` widget so the regular `Robot` API can
+run against a `WorldModel` without IPython, ipywidgets or a browser. Frontend
+calls are not serialized or throttled; they can optionally be kept in memory
+for inspection.
+"""
+
+import contextlib
+
+from .events import Event, EventBus
+from .models.levels import load_world
+from .robot import Robot
+
+
+class HeadlessMaze():
+    """Runs robots against a `WorldModel` without any frontend.
+
+    Parameters
+    ----------
+    model : WorldModel
+        world to simulate.
+    record : bool
+        keep every frontend call as ``[method_name, params]`` in ``calls``.
+    recorder : TraceRecorder
+        optional trace recorder receiving the calls as `Maze` would send them.
+    """
+
+    def __init__(self, model, record=False, recorder=None):
+        self.model = model
+        self.calls = [] if record else None
+        self.recorder = recorder
+        self.output = []
+        # the same event bus as `Maze`, without the widget sink
+        self.events = EventBus()
+        if record:
+            self.events.subscribe(self.record_call)
+        if recorder is not None:
+            self.events.subscribe(recorder.record_event)
+        self.robots = [Robot(idx, x, self)
+                       for idx, x in enumerate(self.model.robots)]
+
+    def js_call(self, method_name, params):
+        if not self.model.has_balance():
+            if self.events.sinks:
+                self.events.emit(Event({'method_name': 'halt', 'params': [],
+                                        'ui_id': self.model.ui_id}))
+            raise RuntimeError("Instruction Quota Exceeded")
+
+        # nothing to build when no sink listens, the grading fast path
+        if self.events.sinks:
+            self.events.emit(Event({'method_name': method_name,
+                                    'params': params,
+                                    'stats': self.bot().stats.report(),
+                                    'ui_id': self.model.ui_id}))
+
+    def record_call(self, event):
+        if event.method_name != 'halt':
+            self.calls.append([event.method_name, event.params])
+
+    def redraw_all(self):
+        self.model.render_all(self.js_call)
+
+    @contextlib.contextmanager
+    def batching(self):
+        # nothing is sent, so nothing to group
+        yield self
+
+    def flush(self):
+        pass
+
+    def bot(self, bot_index=0):
+        return self.robots[bot_index]
+
+    def get_description(self):
+        return self.model.description
+
+    def print_description(self):
+        self.output.append(("info", self.get_description()))
+
+    def print_success(self, msg):
+        if msg is not None:
+            self.output.append(("success", msg))
+
+    def print_error(self, msg):
+        if msg is not None:
+            self.output.append(("error", msg))
+
+    def check(self, bot_index=0):
+        return self.model.check(self.bot(bot_index))
+
+
+def get_bot(path, initFn=None, options={}, record=False, recorder=None):
+    """Loads a world file and returns its first robot, without a frontend.
+
+    Examples
+    --------
+    >>> bot = get_bot("./worlds/level1.json")
+    >>> bot.move()
+    >>> bot.world.check()
+    True
+    """
+    world = load_world(path, initFn, options)
+    return HeadlessMaze(world, record=record, recorder=recorder).bot()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Bulk checks of level files.
+
+Every level of a directory is parsed with `WorldParser` in a process pool,
+without any widget or IPython import, and checked for:
+
+* coordinates (robots, walls, tiles, objects, flags, messages, goals) that
+  fall outside the world, for the smallest dimensions a random world can get;
+* position, pick, wall and drop goals that can not be reached from one of the
+  possible initial positions of the robot;
+* goals that can never be met, like picking more objects than a cell holds.
+
+Command line::
+
+    python -m ottopy.linter worlds/ -j 8 -o lint.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+
+from .models.goal import DropGoal, ObjectGoal, PositionGoal, WallGoal
+from .models.world_model import Direction, WorldModel
+from .models.world_parser import VariantRandom, WorldParser
+from .solver import get_solver
+
+ERROR = "error"
+WARNING = "warning"
+
+
+def value_range(value):
+    """Smallest and largest value a level field can be parsed to."""
+    if isinstance(value, list):
+        values = [int(v) for v in value]
+        return min(values), max(values)
+    if isinstance(value, str) and "-" in value:
+        low, high = map(int, value.split("-"))
+        return low, high
+    return int(value), int(value)
+
+
+def parse_pos(pos):
+    if isinstance(pos, str):
+        return tuple(map(int, pos.split(",")))
+    return tuple(map(int, pos))
+
+
+class LevelLinter():
+    """Collects the issues of one level config."""
+
+    def __init__(self, config):
+        self.config = config
+        self.issues = []
+
+    def report(self, kind, message, severity=ERROR):
+        self.issues.append({"kind": kind, "severity": severity,
+                            "message": message})
+
+    def positions(self):
+        """Yields ``(what, (x, y))`` for every coordinate of the config."""
+        config = self.config
+        for i, robot in enumerate(config.get("robots", [])):
+            if robot.get("x") is not None:
+                yield "robot {}".format(i), (robot["x"], robot["y"])
+            for pos in robot.get("possible_initial_positions", None) or []:
+                yield "robot {} initial position".format(i), pos
+        for field in ("walls", "tiles", "objects", "messages"):
+            for pos in config.get(field, {}):
+                yield field[:-1], pos
+        for pos in config.get("flags", []):
+            yield "flag", pos
+
+        goal = config.get("goal", {})
+        for pos in goal.get("possible_final_positions", []):
+            yield "final position", pos
+        position = goal.get("position", None)
+        if position is not None:
+            yield "final position", (position["x"], position["y"])
+        for field in ("walls", "objects"):
+            for pos in goal.get(field, {}):
+                yield "{} goal".format(field[:-1]), pos
+
+    def check_bounds(self):
+        rows, _ = value_range(self.config["rows"])
+        cols, _ = value_range(self.config["cols"])
+        ok = True
+        for what, pos in self.positions():
+            x, y = parse_pos(pos)
+            if not (1 <= x <= cols and 1 <= y <= rows):
+                self.report("bounds", "{} at {},{} is outside the {}x{} world"
+                            .format(what, x, y, cols, rows))
+                ok = False
+        return ok
+
+    def check_goals(self):
+        config = self.config
+        goal = config.get("goal", {})
+        objects = config.get("objects", {})
+        if len(goal) == 0:
+            self.report("goals", "level has no goal", WARNING)
+
+        for pos, wanted in goal.get("objects", {}).items():
+            here = objects.get(pos, {})
+            for name, val in wanted.items():
+                if name not in here:
+                    self.report("contradiction",
+                                "pick goal of {} {} at {} with no {} there"
+                                .format(val, name, pos, name))
+                elif int(val) > value_range(here[name])[1]:
+                    self.report("contradiction",
+                                "pick goal of {} {} at {} holding at most {}"
+                                .format(val, name, pos,
+                                        value_range(here[name])[1]))
+
+        for pos, directions in goal.get("walls", {}).items():
+            for direction in directions:
+                try:
+                    Direction.get_dir(direction)
+                except (KeyError, ValueError):
+                    self.report("goals", "wall goal at {} has an unknown "
+                                "direction {!r}".format(pos, direction))
+
+    def starts(self):
+        for robot in self.config.get("robots", []):
+            positions = robot.get("possible_initial_positions", None)
+            if positions:
+                yield [parse_pos(p) for p in positions]
+            else:
+                yield [(robot.get("x"), robot.get("y"))]
+
+    def targets(self, world):
+        """Goal cells of the parsed world, position goals taken from all the
+        possible final positions."""
+        goal = self.config.get("goal", {})
+        for pos in goal.get("possible_final_positions", []):
+            yield "final position", parse_pos(pos)
+        for g in world.goals:
+            if isinstance(g, PositionGoal) and \
+                    not goal.get("possible_final_positions"):
+                yield "final position", (g.x, g.y)
+            elif isinstance(g, ObjectGoal):
+                yield "pick goal", (g.x, g.y)
+            elif isinstance(g, WallGoal):
+                yield "wall goal", (g.x, g.y)
+            elif isinstance(g, DropGoal):
+                yield "drop goal", (g.x, g.y)
+
+    def check_reachability(self, world):
+        solver = get_solver(world)
+        targets = list(self.targets(world))
+        for i, starts in enumerate(self.starts()):
+            for start in starts:
+                reachable = solver.reachable(*start)
+                for what, cell in targets:
+                    if cell not in reachable:
+                        self.report("unreachable",
+                                    "{} at {},{} can not be reached by robot "
+                                    "{} from {},{}".format(what, cell[0],
+                                                           cell[1], i,
+                                                           *start))
+
+    def lint(self):
+        if not self.check_bounds():
+            return self.issues
+        self.check_goals()
+
+        world = WorldModel()
+        try:
+            WorldParser.parse(world, self.config, VariantRandom())
+        except Exception as e:
+            self.report("parse", "{}: {}".format(type(e).__name__, e))
+            return self.issues
+        self.check_reachability(world)
+        return self.issues
+
+
+def lint_level(path):
+    """Lints the level file at `path`, runs in pool workers."""
+    try:
+        with open(path, "r") as f:
+            config = json.loads(f.read())
+        issues = LevelLinter(config).lint()
+    except Exception as e:
+        issues = [{"kind": "parse", "severity": ERROR,
+                   "message": "{}: {}".format(type(e).__name__, e)}]
+    return {"level": path,
+            "ok": not any(i["severity"] == ERROR for i in issues),
+            "issues": issues}
+
+
+def find_levels(levels):
+    if isinstance(levels, str):
+        if os.path.isdir(levels):
+            return sorted(glob(os.path.join(levels, "**", "*.json"),
+                               recursive=True))
+        return [levels]
+    return list(levels)
+
+
+def lint(levels="worlds", processes=None, chunksize=None):
+    """Lints every level of a directory (or a list of paths) in a process
+    pool.
+
+    Returns
+    -------
+    dict
+        level, error and warning counts and one result per level, in path
+        order.
+
+    Examples
+    --------
+    >>> report = lint("worlds/")
+    >>> [r["level"] for r in report["results"] if not r["ok"]]
+    ['worlds/level7.json']
+    """
+    paths = find_levels(levels)
+    if processes == 1 or len(paths) <= 1:
+        results = [lint_level(path) for path in paths]
+    else:
+        processes = processes or os.cpu_count() or 1
+        if chunksize is None:
+            chunksize = max(1, len(paths) // (processes * 4))
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(lint_level, paths, chunksize=chunksize))
+
+    issues = [i for r in results for i in r["issues"]]
+    return {
+        "levels": len(results),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "errors": sum(1 for i in issues if i["severity"] == ERROR),
+        "warnings": sum(1 for i in issues if i["severity"] == WARNING),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="ottopy-lint",
+        description="Check every level file of a directory.")
+    parser.add_argument("levels", nargs="?", default="worlds",
+                        help="directory of level json files, or one file")
+    parser.add_argument("-j", "--processes", type=int, default=None)
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the json report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = lint(args.levels, processes=args.processes)
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
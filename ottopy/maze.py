@@ -9,13 +9,22 @@ from traitlets import Unicode, Bool, Float, observe
 from ._frontend import module_name, module_version
 from IPython.display import HTML as html_print
 from IPython.display import display
+from IPython import get_ipython
+import contextlib
 import copy
+import itertools
+import weakref
+from concurrent.futures import Future
 
 import time as _time
 from datetime import datetime
 import json
 
+from .events import Event, EventBus, encode_frame
 from .robot import Robot
+from .flow_control import CreditWindow, wait_for
+from .replay import get_writer
+from .models.world_model import print_success, print_error
 
 global zoom_level
 zoom_level = 1.0
@@ -30,6 +39,30 @@ def print_desc(msg, color="black"):
         display(html_print(cstr(msg, color=color)))
 
 
+# mazes with a batch or a replay block to flush when the running cell ends;
+# one hook serves them all and only weak references are kept
+_unflushed = weakref.WeakSet()
+_hooked_shell = None
+
+
+def _flush_on_cell_end(*args):
+    for maze in list(_unflushed):
+        _unflushed.discard(maze)
+        maze.flush()
+        maze._flush_replay()
+
+
+def _flush_at_cell_end(maze):
+    global _hooked_shell
+    shell = get_ipython()
+    if shell is None:
+        return
+    if _hooked_shell is not shell:
+        shell.events.register('post_run_cell', _flush_on_cell_end)
+        _hooked_shell = shell
+    _unflushed.add(maze)
+
+
 
 
 class Maze(DOMWidget):
@@ -71,45 +104,240 @@ class Maze(DOMWidget):
         self.execute_js_call(method_name=method_name, params=params)
 
     def execute_js_call(self, method_name, params):
-        cb = datetime.now().strftime('%f')
-        self.model.js_call_counter += 1
-        if self.model.js_call_counter % 10 == 0:
-            _time.sleep(0.50)
-
         if self.model.has_balance():
-            bot = self.bot()
-            stats = bot.stats.report() if bot is not None else {}
-            data = {'method_name': method_name, 'params': params, 'cb': cb, 'stats': stats, 'ui_id': self.model.ui_id} 
-            self.current_call = json.dumps(data)
-            if self.gen_html :
-                self.add_to_html(data)
+            self.send_js_call(method_name, params)
         else:
-            self.current_call = json.dumps(
-                {'method_name': 'halt', 'params': [], 'cb': cb, 'ui_id': self.model.ui_id})
-            
-            if self.gen_html:
-                self.add_to_html({'method_name': 'halt', 'params': [], 'cb': cb, 'ui_id': self.model.ui_id})
+            self.halt()
             raise RuntimeError("Instruction Quota Exceeded")
 
-    def __init__(self, model, floating=False, zoom=None, gen_html=False):
+    def send_js_call(self, method_name, params):
+        # sends a call without checking the instruction quota
+        cb = str(next(self.cb_counter))
+        self.last_cb = cb
+        if self.first_cb is None:
+            self.first_cb = int(cb)
+
+        if self.batch or self.gen_html:
+            _flush_at_cell_end(self)
+
+        bot = self.bot()
+        stats = bot.stats.report() if bot is not None else {}
+        data = {'method_name': method_name, 'params': params, 'cb': cb, 'stats': stats, 'ui_id': self.model.ui_id}
+        try:
+            self.events.emit(Event(data))
+        except BaseException:
+            self._flush_replay()
+            raise
+
+    def halt(self, cb=None):
+        """Makes the view drop the calls it has not executed yet."""
+        if cb is None:
+            cb = str(next(self.cb_counter))
+        data = {'method_name': 'halt', 'params': [], 'cb': cb, 'ui_id': self.model.ui_id}
+        self.events.emit(Event(data))
+        self.flush()
+        self._flush_replay()
+        # the view drops its queue on halt and never acks it
+        self.flow.reset()
+        self._resolve_acks(int(cb))
+
+    def send_call(self, event):
+        # widget sink of the event bus; the batch is checked here only, the
+        # kernel can not run a timer while the cell of the program runs
+        if not self.batch:
+            self.update_current_call(event)
+            return
+
+        if len(self.batch_q) == 0:
+            self.batch_started = _time.monotonic()
+        self.batch_q.append(event)
+
+        if len(self.batch_q) >= self.batch_size or \
+                _time.monotonic() - self.batch_started >= self.batch_interval:
+            self.flush()
+
+    def flush(self):
+        """Sends the queued calls of a batching maze as one frame."""
+        if len(self.batch_q) > 0:
+            calls = self.batch_q
+            self.batch_q = []
+            self.update_current_call(calls)
+
+    @contextlib.contextmanager
+    def batching(self):
+        """Queues the calls made in the block and sends them as one frame
+        when it ends, whatever the batching settings of the maze."""
+        saved = (self.batch, self.batch_size, self.batch_interval)
+        self.batch = True
+        self.batch_size = self.batch_interval = float('inf')
+        try:
+            yield self
+        finally:
+            (self.batch, self.batch_size, self.batch_interval) = saved
+            self.flush()
+
+    def update_current_call(self, payload):
+        # one event, or a list of them sent as one array frame
+        self.model.js_call_counter += 1
+        self.flow.acquire()
+
+        if isinstance(payload, list):
+            self.current_call = encode_frame(payload)
+            last_call = payload[-1]
+        else:
+            self.current_call = payload.encode()
+            last_call = payload
+        # a frame is acked with the cb of its last call
+        self.flow.sent(last_call.data['cb'])
+
+    @observe('method_return')
+    def _on_method_return(self, change):
+        try:
+            cb = json.loads(change['new']).get('cb', None)
+        except ValueError:
+            return
+        if cb is not None:
+            self.flow.ack(str(cb))
+            self._resolve_acks(int(cb))
+
+    @observe('is_inited')
+    def _on_inited(self, change):
+        if change['new'] and not self.ready.done():
+            self.ready.set_result(True)
+
+    def _on_view_ready(self, seen):
+        # every view reports when it is rendered, with the cb of the first
+        # call it found in `current_call`; a view that missed calls sent
+        # before it draws the whole world again, the others keep their
+        # trace and messages
+        if not self.ready.done():
+            self.ready.set_result(True)
+        if seen is not None and self.first_cb is not None and \
+                int(seen) > self.first_cb:
+            self.model.render_all(self.send_js_call, self.zoom)
+            self.flush()
+
+    def _resolve_acks(self, cb):
+        # a frame acks the calls sent before it as well
+        self.acked = max(self.acked, cb)
+        for key in [k for k in self.ack_waiters if k <= cb]:
+            future = self.ack_waiters.pop(key)
+            if not future.done():
+                future.set_result(cb)
+
+    def expect_ack(self, cb):
+        """Future resolved once the frontend has executed the call `cb`."""
+        cb = int(cb)
+        if cb <= self.acked:
+            future = Future()
+            future.set_result(self.acked)
+            return future
+        future = self.ack_waiters.get(cb, None)
+        if future is None:
+            future = self.ack_waiters[cb] = Future()
+        return future
+
+    def wait_ready(self, timeout=3.0):
+        """Blocks until the view is rendered, at most `timeout` seconds.
+
+        A view that renders after the first calls draws the world again on
+        its own, waiting is only needed to show the first calls of a cell as they are made.
+
+        Returns
+        -------
+        bool
+            False on timeout, or right away when the view can not be heard
+            from before the running cell ends (see
+            `_kernel.enable_comm_dispatch`).
+        """
+        return wait_for(self.ready, timeout)
+
+    def wait_ack(self, cb, timeout=3.0):
+        """Blocks until the frontend has executed the call `cb`, at most
+        `timeout` seconds. False on timeout, or right away when dispatch is
+        not enabled, like `wait_ready`."""
+        self.flush()
+        return wait_for(self.expect_ack(cb), timeout)
+
+    def _flush_replay(self):
+        # ends the script block, so a run that stopped on an error still
+        # leaves a valid replay file
+        if self.gen_html:
+            self.replay.flush()
+
+    def close(self):
+        _unflushed.discard(self)
+        self.flush()
+        self._flush_replay()
+        super(Maze, self).close()
+
+    def __init__(self, model, floating=False, zoom=None, gen_html=False,
+                 batch=False, batch_size=50, batch_interval=0.25,
+                 recorder=None):
 
         super(Maze, self).__init__()
         global zoom_level
         self.model = model
         self.floating = floating
         self.gen_html = gen_html
+        self.replay = get_writer() if gen_html else None
+        self.recorder = recorder
+        # every call for the view is published here, once encoded
+        self.events = EventBus()
+        self.events.subscribe(self.send_call)
+        if gen_html:
+            self.events.subscribe(self.replay.write_event)
+        if recorder is not None:
+            self.events.subscribe(recorder.record_event)
+        # resolved when the view is rendered, sets `is_inited` and sends its
+        # `ready` message
+        self.ready = Future()
+        self.ack_waiters = {}
+        self.acked = 0
+        self.last_cb = None
+        self.first_cb = None
         self.is_inited = False
         self.zoom = zoom or zoom_level
         self.robots = [Robot(idx, x, self)
                        for idx, x in enumerate(self.model.robots)]
 
         self.js_call_q = []
+        self.cb_counter = itertools.count(1)
+        self.flow = CreditWindow()
+
+        # with batching, calls are queued and sent as a single array frame
+        # every `batch_size` calls and at the end of the running cell. The
+        # `batch_interval` is only checked when a call is queued: a frame is
+        # sent with the first call made `batch_interval` seconds after the
+        # oldest queued one, not by a timer, so calls queued before the
+        # program blocks or computes wait for its next call or the cell end
+        self.batch = batch
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.batch_q = []
+        self.batch_started = None
+
+        self.on_msg(self._on_frontend_msg)
+
         self.init_time = datetime.now()
         display(self)
         
     
-    def redraw_all(self):
-        self.model.render_all(self.js_call)
+    def redraw_all(self, timeout=None):
+        """Draws the whole world; with a `timeout`, blocks until the
+        frontend has drawn it and returns False if it did not in time."""
+        self.model.render_all(self.js_call, self.zoom)
+        if timeout is not None:
+            return self.wait_ack(self.last_cb, timeout)
+
+    def _on_frontend_msg(self, widget, content, buffers):
+        if content.get('event') == 'ready':
+            self._on_view_ready(content.get('cb', None))
+        # chunked worlds: the view asks for the blocks it pans over
+        elif content.get('event') == 'request_chunks':
+            chunks = [self.model.render_chunk(*block)
+                      for block in content.get('chunks', [])]
+            self.send({'event': 'draw_chunks', 'chunks': chunks})
 
 
     def bot(self, bot_index=0):
@@ -121,19 +349,17 @@ class Maze(DOMWidget):
     def print_description(self):
         print_desc(self.get_description())
 
+    def print_success(self, msg):
+        print_success(msg)
+
+    def print_error(self, msg):
+        print_error(msg)
+
     def check(self, bot_index=0):
         val = self.model.check(self.bot(bot_index))
         if val:
             self.js_call('set_succes_msg', ['🎉 Task Completed'])
         else:
             self.js_call('error', ["🤭 One Or More goals are Not Completed."])
+        self._flush_replay()
         return val
-
-
-
-    def add_to_html(self, params):
-        script = f"<script>steps.push({json.dumps(params)})</script>"
-        with open('last_run.html', 'a') as f:
-            f.write(script)
-
- 
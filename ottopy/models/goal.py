@@ -1,3 +1,6 @@
+from .grid import pos_key
+
+
 class PositionGoal():
     def __init__(self, config):
         self.x = config.get("x")
@@ -51,7 +54,7 @@ class ObjectGoal():
         self.val  = config.get('val')
 
     def is_completed(self, bot, world=None):
-        obj = bot.collections.get("{},{}".format(self.x, self.y), {})
+        obj = bot.collections.get(pos_key(self.x, self.y), {})
         val = obj.get(self.obj_name, 0)
         return self.val == val
 
@@ -84,8 +87,7 @@ class DropGoal():
         self.val  = config.get('val')
 
     def is_completed(self, bot, world=None):
-        pos = "{},{}".format(self.x,self.y)
-        obj = world.objects.get(pos, {})
+        obj = world.objects.get(pos_key(self.x, self.y), {})
         val = obj.get(self.obj_name, None)
         return val == self.val
 
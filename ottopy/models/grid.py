@@ -0,0 +1,404 @@
+from array import array
+from bisect import bisect_left
+
+EDITABLE_PICK = 1
+EDITABLE_DROP = 2
+EDITABLE_ALL = EDITABLE_PICK | EDITABLE_DROP
+EDITABLE_BITS = {"pick": EDITABLE_PICK, "drop": EDITABLE_DROP}
+
+BLOCKED_EAST = 1
+BLOCKED_NORTH = 2
+BLOCKED_WEST = 4
+BLOCKED_SOUTH = 8
+
+# objects, flags, messages and robot collections are keyed by the packed
+# 1-based cell coordinates; "x,y" strings only exist in the level json and
+# in what is sent to the frontend
+POS_BITS = 16
+POS_MASK = (1 << POS_BITS) - 1
+# largest side of a world whose cells, and the border cells next to them,
+# get distinct keys
+MAX_SIDE = POS_MASK - 1
+
+
+def pos_key(x, y):
+    return x << POS_BITS | y
+
+
+def key_pos(key):
+    return key >> POS_BITS, key & POS_MASK
+
+
+def keyed_json(store):
+    """Converts a store keyed by `pos_key` to the "x,y" keyed json form."""
+    return {"{},{}".format(key >> POS_BITS, key & POS_MASK): val
+            for key, val in store.items()}
+
+
+class Grid():
+    """A width x height grid stored column by column in one flat buffer.
+
+    Indexing keeps the nested list interface, ``grid[x][y]``, through light
+    column views; `get`/`set` are the direct accessors.
+
+    A grid made by `share` reads the buffer of the grid it was made from and
+    only copies it on its first write.
+    """
+    shared = False
+
+    def __init__(self, width, height, buffer):
+        self.width = width
+        self.height = height
+        self.buffer = buffer
+
+    def get(self, x, y):
+        return self.buffer[x * self.height + y]
+
+    def set(self, x, y, val):
+        if self.shared:
+            self.unshare()
+        self.buffer[x * self.height + y] = val
+
+    def __getitem__(self, x):
+        if x < 0:
+            x += self.width
+        if not 0 <= x < self.width:
+            raise IndexError("grid index out of range")
+        return GridColumn(self, x)
+
+    def __len__(self):
+        return self.width
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield GridColumn(self, x)
+
+    def tolist(self):
+        return [column.tolist() for column in self]
+
+    def items(self):
+        """Yields ``(x, y, val)`` for every cell holding a non zero value."""
+        h = self.height
+        for i, val in enumerate(self.buffer):
+            if val:
+                yield i // h, i % h, val
+
+    def region(self, x0, y0, w, h):
+        """Like `items`, restricted to the w x h block starting at x0, y0."""
+        for x in range(max(x0, 0), min(x0 + w, self.width)):
+            for y in range(max(y0, 0), min(y0 + h, self.height)):
+                val = self.get(x, y)
+                if val:
+                    yield x, y, val
+
+    def copy(self):
+        grid = self.share()
+        grid.unshare()
+        return grid
+
+    def share(self):
+        grid = object.__new__(type(self))
+        grid.__dict__.update(self.__dict__)
+        grid.shared = True
+        return grid
+
+    def unshare(self):
+        self.buffer = self.buffer[:]
+        self.shared = False
+
+
+class GridColumn():
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def _y(self, y):
+        if y < 0:
+            y += self.grid.height
+        if not 0 <= y < self.grid.height:
+            raise IndexError("grid index out of range")
+        return y
+
+    def __getitem__(self, y):
+        return self.grid.get(self.x, self._y(y))
+
+    def __setitem__(self, y, val):
+        self.grid.set(self.x, self._y(y), val)
+
+    def __len__(self):
+        return self.grid.height
+
+    def __iter__(self):
+        for y in range(self.grid.height):
+            yield self.grid.get(self.x, y)
+
+    def tolist(self):
+        return list(self)
+
+
+class WallGrid(Grid):
+    """`WallType` flags of the walls, one byte per wall.
+
+    `on_change` is called with ``(grid, x, y)`` after every write.
+    """
+
+    def __init__(self, width, height, on_change=None):
+        super(WallGrid, self).__init__(width, height,
+                                       bytearray(width * height))
+        self.on_change = on_change
+
+    def set(self, x, y, val):
+        if self.shared:
+            self.unshare()
+        self.buffer[x * self.height + y] = val
+        if self.on_change is not None:
+            self.on_change(self, x, y)
+
+    def share(self):
+        # a copy belongs to no world until one adopts it
+        grid = super(WallGrid, self).share()
+        grid.on_change = None
+        return grid
+
+    def tolist(self):
+        h = self.height
+        return [list(self.buffer[x * h:(x + 1) * h]) for x in range(self.width)]
+
+
+class FlagGrid(Grid):
+    """Bit flags per cell, one byte per cell."""
+
+    def __init__(self, width, height, default=0):
+        super(FlagGrid, self).__init__(width, height,
+                                       bytearray([default]) * (width * height))
+
+
+class TileGrid(Grid):
+    """Cell backgrounds stored as indices into a table of distinct values."""
+
+    def __init__(self, width, height):
+        super(TileGrid, self).__init__(width, height,
+                                       array('H', bytes(2 * width * height)))
+        self.values = [None]
+        self.index = {None: 0}
+
+    def get(self, x, y):
+        return self.values[self.buffer[x * self.height + y]]
+
+    def set(self, x, y, val):
+        if self.shared:
+            self.unshare()
+        key = tuple(val) if isinstance(val, list) else val
+        i = self.index.get(key, None)
+        if i is None:
+            i = len(self.values)
+            self.values.append(val)
+            self.index[key] = i
+        self.buffer[x * self.height + y] = i
+
+    def items(self):
+        h = self.height
+        for i, val in enumerate(self.buffer):
+            if val:
+                yield i // h, i % h, self.values[val]
+
+    def unshare(self):
+        super(TileGrid, self).unshare()
+        self.values = self.values[:]
+        self.index = dict(self.index)
+
+
+class SparseGrid(Grid):
+    """A grid holding only the cells that differ from `default`.
+
+    Values live in a dict keyed by the packed ``x * height + y`` index, so
+    memory scales with the number of features rather than with the area.
+    """
+
+    def __init__(self, width, height, default=0):
+        super(SparseGrid, self).__init__(width, height, {})
+        self.default = default
+
+    def get(self, x, y):
+        return self.buffer.get(x * self.height + y, self.default)
+
+    def set(self, x, y, val):
+        if self.shared:
+            self.unshare()
+        if val == self.default:
+            self.buffer.pop(x * self.height + y, None)
+        else:
+            self.buffer[x * self.height + y] = val
+
+    def items(self):
+        h = self.height
+        for i, val in self.buffer.items():
+            yield i // h, i % h, val
+
+    def region(self, x0, y0, w, h):
+        # scan whichever is smaller, the block or the stored entries
+        if w * h > len(self.buffer):
+            for x, y, val in self.items():
+                if x0 <= x < x0 + w and y0 <= y < y0 + h:
+                    yield x, y, val
+        else:
+            for x, y, val in super(SparseGrid, self).region(x0, y0, w, h):
+                yield x, y, val
+
+    def unshare(self):
+        self.buffer = dict(self.buffer)
+        self.shared = False
+
+
+class SparseWallGrid(SparseGrid):
+    """`WallGrid` counterpart for large worlds."""
+
+    def __init__(self, width, height, on_change=None):
+        super(SparseWallGrid, self).__init__(width, height, 0)
+        self.on_change = on_change
+
+    def set(self, x, y, val):
+        super(SparseWallGrid, self).set(x, y, val)
+        if self.on_change is not None:
+            self.on_change(self, x, y)
+
+    def share(self):
+        grid = super(SparseWallGrid, self).share()
+        grid.on_change = None
+        return grid
+
+
+class SparseBlockedGrid(SparseGrid):
+    """Blocked-direction masks of a large world.
+
+    Only cells next to a wall are stored; the mask of any other cell is
+    made of the borders it touches.
+    """
+
+    def __init__(self, width, height):
+        super(SparseBlockedGrid, self).__init__(width, height, None)
+
+    def get(self, x, y):
+        mask = self.buffer.get(x * self.height + y, None)
+        if mask is None:
+            mask = 0
+            if x == self.width - 1:
+                mask |= BLOCKED_EAST
+            if y == self.height - 1:
+                mask |= BLOCKED_NORTH
+            if x == 0:
+                mask |= BLOCKED_WEST
+            if y == 0:
+                mask |= BLOCKED_SOUTH
+        return mask
+
+
+class CellGrid(Grid):
+    """Creates the `Cell` views of a world on demand."""
+
+    def __init__(self, world, cell_class):
+        super(CellGrid, self).__init__(world.cols, world.rows, None)
+        self.world = world
+        self.cell_class = cell_class
+
+    def get(self, x, y):
+        return self.cell_class(x + 1, y + 1, self.world)
+
+    def set(self, x, y, val):
+        raise TypeError("cells are views of the world storage")
+
+    def copy(self):
+        return self
+
+    def share(self):
+        return self
+
+
+class WallStops():
+    """Sorted positions of the blocking walls along every row (or column)
+    of a world. Lines without walls take no memory, and the next wall in
+    either direction is found by bisection."""
+    shared = False
+
+    def __init__(self):
+        self.lines = {}
+
+    def set(self, line, pos, blocked):
+        if self.shared:
+            self.unshare()
+        stops = self.lines.get(line, None)
+        if stops is None:
+            if not blocked:
+                return
+            stops = self.lines[line] = []
+        i = bisect_left(stops, pos)
+        present = i < len(stops) and stops[i] == pos
+        if blocked and not present:
+            stops.insert(i, pos)
+        elif not blocked and present:
+            del stops[i]
+            if len(stops) == 0:
+                del self.lines[line]
+
+    def next(self, line, pos, default):
+        """First stop at or after `pos`, `default` if there is none."""
+        stops = self.lines.get(line, None)
+        if stops is None:
+            return default
+        i = bisect_left(stops, pos)
+        return stops[i] if i < len(stops) else default
+
+    def copy(self):
+        stops = self.share()
+        stops.unshare()
+        return stops
+
+    def share(self):
+        stops = WallStops()
+        stops.lines = self.lines
+        stops.shared = True
+        return stops
+
+    def unshare(self):
+        self.lines = {line: pos[:] for line, pos in self.lines.items()}
+        self.shared = False
+
+    def prev(self, line, pos, default):
+        """Last stop before `pos`, `default` if there is none."""
+        stops = self.lines.get(line, None)
+        if stops is None:
+            return default
+        i = bisect_left(stops, pos)
+        return stops[i - 1] if i > 0 else default
+
+
+class Editable():
+    """Dict like view of the pick/drop flags of one cell."""
+
+    def __init__(self, flags, x, y):
+        self.flags = flags
+        self.x = x
+        self.y = y
+
+    def __getitem__(self, key):
+        return bool(self.flags.get(self.x, self.y) & EDITABLE_BITS[key])
+
+    def __setitem__(self, key, val):
+        bit = EDITABLE_BITS[key]
+        flags = self.flags.get(self.x, self.y)
+        self.flags.set(self.x, self.y, flags | bit if val else flags & ~bit)
+
+    def get(self, key, default=None):
+        return self[key] if key in EDITABLE_BITS else default
+
+    def keys(self):
+        return EDITABLE_BITS.keys()
+
+    def items(self):
+        return [(key, self[key]) for key in EDITABLE_BITS]
+
+    def __eq__(self, other):
+        return dict(self.items()) == dict(other.items())
+
+    def __repr__(self):
+        return repr(dict(self.items()))
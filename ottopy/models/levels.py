@@ -0,0 +1,93 @@
+import json
+import os
+
+from .world_model import WorldModel
+from .world_parser import VariantRandom, WorldParser
+from .world_template import WorldTemplate
+
+
+class CachedLevel():
+    """A level file parsed once: its config, a template of the parts of the
+    level drawn without randomness when its dimensions are fixed, and the
+    templates of the variants compiled so far."""
+
+    def __init__(self, path, stamp):
+        self.path = path
+        self.stamp = stamp
+        with open(path, "r") as f:
+            self.config = json.loads(f.read())
+
+        self.layout = None
+        parser = WorldParser(WorldModel(), self.config)
+        if parser.has_fixed_layout():
+            parser.parse_layout()
+            self.layout = WorldTemplate(parser.world)
+        self.variants = {}
+
+    def instantiate(self, initFn=None, options={}):
+        world = WorldModel(None, None, options, template=self.layout)
+        rng = world.options.get('rng', None)
+        if self.layout is None:
+            WorldParser.parse(world, self.config, rng)
+        else:
+            # only robots, objects and goals are drawn again
+            WorldParser(world, self.config, rng).parse_contents()
+
+        if initFn is not None and callable(initFn):
+            initFn(world)
+        return world
+
+    def template(self, variant):
+        """The `WorldTemplate` of a variant, a dict with the ``seed`` and
+        ``choices`` of its random draws."""
+        key = (variant["seed"], tuple(variant["choices"]))
+        template = self.variants.get(key, None)
+        if template is None:
+            rng = VariantRandom(variant["seed"], variant["choices"])
+            template = self.variants[key] = WorldParser.compile(self.config,
+                                                                rng)
+        return template
+
+
+class LevelCache():
+    """Process wide cache of parsed level files.
+
+    Entries are keyed by absolute path and dropped when the modification
+    time or the size of the file changes, so an edited level is picked up
+    on the next load.
+    """
+
+    def __init__(self):
+        self.levels = {}
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        level = self.levels.get(path, None)
+        if level is None or level.stamp != stamp:
+            level = self.levels[path] = CachedLevel(path, stamp)
+        return level
+
+    def clear(self):
+        self.levels = {}
+
+
+level_cache = LevelCache()
+
+
+def load_config(path):
+    return level_cache.get(path).config
+
+
+def load_world(path, initFn=None, options={}):
+    """Builds a `WorldModel` of the level at `path`, like
+    ``WorldModel(path, initFn, options)`` but without reading and parsing
+    the file again when it has not changed."""
+    return level_cache.get(path).instantiate(initFn, options)
+
+
+def load_template(path, variant):
+    """The compiled `WorldTemplate` of a variant of the level at `path`,
+    see `CachedLevel.template`."""
+    return level_cache.get(path).template(variant)
@@ -1,13 +1,14 @@
 from .robot_model import RobotModel
 from .world_parser import WorldParser
 
-from IPython.display import HTML as html_print
-from IPython.display import display
-
 import json
 from enum import Enum, IntFlag
 from functools import partial
 from .tile_map import DEFAULT_TILE_MAP
+from .grid import (CellGrid, Editable, FlagGrid, SparseBlockedGrid, SparseGrid,
+                   SparseWallGrid, TileGrid, WallGrid, WallStops, BLOCKED_EAST,
+                   BLOCKED_NORTH, BLOCKED_SOUTH, BLOCKED_WEST, EDITABLE_ALL,
+                   MAX_SIDE, key_pos, keyed_json, pos_key)
 
 
 from .goal import class_list, Goal, PositionGoal, DropGoal
@@ -17,20 +18,32 @@ def cstr(s, color='black'):
     return "<text style=color:{}>{}</text>".format(color, s)
 
 
+def display_html(html):
+    # imported lazily so the simulation models load without IPython
+    from IPython.display import HTML, display
+    display(HTML(html))
+
+
 def print_success(msg, color="blue"):
     if msg is not None:
-        display(html_print(
-            cstr("\N{speech balloon} {}".format(msg), color=color)))
+        display_html(cstr("\N{speech balloon} {}".format(msg), color=color))
 
 
 def print_error(error):
     if error is not None:
-        display(html_print(cstr("✗ {}".format(error), color="red")))
+        display_html(cstr("✗ {}".format(error), color="red"))
 
 
+# deprecated: worlds are no longer capped, kept for code importing them
 MAX_ROWS = 20
 MAX_COLS = 20
 
+# worlds with more cells are stored sparsely and rendered chunk by chunk
+MAX_DENSE_CELLS = 100 * 100
+CHUNK_SIZE = 16
+# cells per side of the first viewport of a chunked world at zoom 1
+VIEWPORT_CELLS = 32
+
 
 class WallType(IntFlag):
     NORMAL = 1
@@ -38,6 +51,10 @@ class WallType(IntFlag):
     GOAL = 4
 
 
+# plain int for the hot paths, IntFlag operators are slow
+NORMAL_WALL = WallType.NORMAL.value
+
+
 class Direction(Enum):
     EAST = 0
     NORTH = 1
@@ -55,13 +72,45 @@ class Direction(Enum):
 
 
 class Cell:
+    """View of one cell of a world, created on demand by `WorldModel.cells`.
+
+    All the state lives in the world storage, so views of the same cell are
+    interchangeable.
+    """
+    __slots__ = ("x", "y", "world")
+
     def __init__(self, x, y, world, background=None, msg=None):
         self.x = x
         self.y = y
         self.world = world
-        self.background = background
-        self.msg = msg
-        self.editable = {"pick": True, "drop": True}
+        if background is not None:
+            self.background = background
+        if msg is not None:
+            self.msg = msg
+
+    @property
+    def background(self):
+        return self.world.tiles.get(self.x - 1, self.y - 1)
+
+    @background.setter
+    def background(self, value):
+        self.world.tiles.set(self.x - 1, self.y - 1, value)
+
+    @property
+    def msg(self):
+        return self.world.messages.get(pos_key(self.x, self.y), None)
+
+    @msg.setter
+    def msg(self, value):
+        pos = pos_key(self.x, self.y)
+        if value is None:
+            self.world.messages.pop(pos, None)
+        else:
+            self.world.messages[pos] = value
+
+    @property
+    def editable(self):
+        return Editable(self.world.editable, self.x - 1, self.y - 1)
 
     def walls_list(self, direction):
         direction = Direction.get_dir(direction)
@@ -100,15 +149,15 @@ class Cell:
         #     self.world._add_goal("wall",  {"x":x, "y": y, "walls": [ui_dir]} )
 
         if direction == Direction.EAST or direction == Direction.WEST:
-            self.world.vwalls[x][y] = val
+            self.world.vwalls.set(x, y, val)
 
         if direction == Direction.NORTH or direction == Direction.SOUTH:
-            self.world.hwalls[x][y] = val
+            self.world.hwalls.set(x, y, val)
 
     def get_wall(self, direction):
         walls = self.walls_list(direction)
         [x, y] = self.wall_cord(direction)
-        return walls[x][y]
+        return walls.get(x, y)
 
     def wall_ui_params(self, direction):
         [x, y] = self.wall_cord(direction)
@@ -154,15 +203,11 @@ class Cell:
             call_js('add_msg', [self.x, self.y, self.msg])
 
     def has_wall(self, direction):
-        walls = self.walls_list(direction)
-        [x, y] = self.wall_cord(direction)
-        wall_type = WallType(walls[x][y])
+        wall_type = WallType(self.get_wall(direction))
         return WallType.NORMAL in wall_type
 
     def has_goal_wall(self, direction):
-        walls = self.walls_list(direction)
-        [x, y] = self.wall_cord(direction)
-        wall_type = WallType(walls[x][y])
+        wall_type = WallType(self.get_wall(direction))
         return WallType.GOAL in wall_type
 
     def has_border(self, direction):
@@ -179,21 +224,26 @@ class Cell:
         return False
 
     def has_block(self, direction):
-        return self.has_border(direction) or self.has_wall(direction)
+        direction = Direction.get_dir(direction)
+        return self.world.blocked.get(self.x - 1, self.y - 1) >> direction.value & 1 == 1
 
 
 class WorldModel():
-    def __init__(self, path=None, initFn=None, options={}):
+    def __init__(self, path=None, initFn=None, options={}, template=None):
         self.objects = {}
         self.robots = []
         self.errors = []
         self.goals = []
         self.description = None
         self.project_title = None
-        self.set_dimensions(10, 10)
+        if template is None:
+            self.set_dimensions(10, 10)
         self.options = {'MAX_INSTRUCTION_COUNT': 1000}
         self.instruction_count = 0
         self.options.update(options)
+        # hard limit checked on every instruction, unlike the quota which is
+        # only checked when the frontend is called
+        self.instruction_limit = self.options.get('INSTRUCTION_LIMIT', None)
         self.js_call_counter = 1
         self.messages = {}
         self.flags = {}
@@ -203,10 +253,14 @@ class WorldModel():
         self.floating = self.options.get('floating', False)
         self.ui_id = f"ttgt_world_{self.options.get('ui_counter', 1)}"
 
+        if template is not None:
+            # a `WorldTemplate`, shared until written
+            template.apply(self)
+
         if path is not None:
             data = self.load_json(path)
 
-            parser = WorldParser.parse(self, data)
+            parser = WorldParser.parse(self, data, self.options.get('rng', None))
 
         if initFn is not None and callable(initFn):
             initFn(self)
@@ -225,6 +279,8 @@ class WorldModel():
 
     def incr_instruction(self, n=1):
         self.instruction_count += n
+        if self.instruction_limit is not None and self.instruction_count > self.instruction_limit:
+            raise RuntimeError("Instruction Limit Exceeded")
 
     def has_balance(self):
         return self.max_instruction_count() > self.instruction_count
@@ -234,16 +290,81 @@ class WorldModel():
             call_js_fn(method_name, params)
 
     def set_dimensions(self, rows=10, cols=10):
-        self.rows = min(rows, MAX_ROWS)
-        self.cols = min(cols, MAX_COLS)
-        self.hwalls = [x[:] for x in [[0] * (self.rows + 1)] * (self.cols + 1)]
-        self.vwalls = [x[:] for x in [[0] * (self.rows + 1)] * (self.cols + 1)]
-        self.tiles = [x[:] for x in [[None] * (self.rows)] * (self.cols)]
-        self.cells = []
-        for i in range(self.cols):
-            self.cells.append([])
-            for j in range(self.rows):
-                self.cells[i].append(Cell(i+1, j+1, self))
+        if max(rows, cols) > MAX_SIDE:
+            raise ValueError("worlds can have at most {} rows and columns, "
+                             "got {}x{}".format(MAX_SIDE, rows, cols))
+        self.rows = rows
+        self.cols = cols
+        self.sparse = rows * cols > MAX_DENSE_CELLS
+        # grids indexed [x][y]; cells are views created on demand
+        if self.sparse:
+            self.hwalls = SparseWallGrid(cols + 1, rows + 1)
+            self.vwalls = SparseWallGrid(cols + 1, rows + 1)
+            self.tiles = SparseGrid(cols, rows, None)
+            self.editable = SparseGrid(cols, rows, EDITABLE_ALL)
+            self.blocked = SparseBlockedGrid(cols, rows)
+        else:
+            self.hwalls = WallGrid(cols + 1, rows + 1)
+            self.vwalls = WallGrid(cols + 1, rows + 1)
+            self.tiles = TileGrid(cols, rows)
+            self.editable = FlagGrid(cols, rows, EDITABLE_ALL)
+            self.blocked = FlagGrid(cols, rows)
+            self.blocked.buffer = self.border_masks(rows, cols)
+        self.cells = CellGrid(self, Cell)
+
+        # bit `direction` of a cell is set when a border or a wall blocks it,
+        # kept in sync with every wall write, like the wall stops: x of the
+        # cells with a wall to the east per row, y of the cells with a wall
+        # to the north per column
+        self.hwalls.on_change = self.wall_changed
+        self.vwalls.on_change = self.wall_changed
+        self.row_stops = WallStops()
+        self.col_stops = WallStops()
+        # bumped on every wall write, for caches of wall dependent results
+        self.wall_version = 0
+
+    @staticmethod
+    def border_masks(rows, cols):
+        # masks of a world without walls, built a column at a time
+        def column(mask):
+            if rows == 1:
+                return bytearray([mask | BLOCKED_NORTH | BLOCKED_SOUTH])
+            return bytearray([mask | BLOCKED_SOUTH]) + \
+                bytearray([mask]) * (rows - 2) + \
+                bytearray([mask | BLOCKED_NORTH])
+
+        if cols == 1:
+            return column(BLOCKED_EAST | BLOCKED_WEST)
+        return column(BLOCKED_WEST) + column(0) * (cols - 2) + \
+            column(BLOCKED_EAST)
+
+    def blocked_mask(self, x, y):
+        mask = 0
+        if x == self.cols or self.vwalls.get(x, y) & NORMAL_WALL:
+            mask |= BLOCKED_EAST
+        if y == self.rows or self.hwalls.get(x, y) & NORMAL_WALL:
+            mask |= BLOCKED_NORTH
+        if x == 1 or self.vwalls.get(x - 1, y) & NORMAL_WALL:
+            mask |= BLOCKED_WEST
+        if y == 1 or self.hwalls.get(x, y - 1) & NORMAL_WALL:
+            mask |= BLOCKED_SOUTH
+        return mask
+
+    def wall_changed(self, walls, x, y):
+        # a wall is shared by the cell at x, y and its east or north neighbour
+        self.wall_version += 1
+        blocked = walls.get(x, y) & NORMAL_WALL
+        if walls is self.vwalls:
+            neighbours = [(x, y), (x + 1, y)]
+            if 1 <= x < self.cols and 1 <= y <= self.rows:
+                self.row_stops.set(y, x, blocked)
+        else:
+            neighbours = [(x, y), (x, y + 1)]
+            if 1 <= y < self.rows and 1 <= x <= self.cols:
+                self.col_stops.set(x, y, blocked)
+        for cx, cy in neighbours:
+            if 1 <= cx <= self.cols and 1 <= cy <= self.rows:
+                self.blocked.set(cx - 1, cy - 1, self.blocked_mask(cx, cy))
 
     def add_tile_map(self, tilemap=None):
         self.tilemap = dict()
@@ -252,23 +373,18 @@ class WorldModel():
             self.tilemap.update(tilemap)
 
     def add_tile(self, x, y, background, call_js=None):
-        cell = self.cells[x - 1][y - 1]
-        cell.background = background
         self.tiles[x - 1][y - 1] = background
 
     def add_msg(self, x, y, msg, call_js=None):
-        pos = "{},{}".format(x, y)
-        self.messages[pos] = msg
+        self.messages[pos_key(x, y)] = msg
         cell = self.cells[x - 1][y - 1]
         cell.add_msg(msg, call_js)
 
     def add_flag(self, x, y, call_js=None):
-        pos = "{},{}".format(x, y)
-        self.flags[pos] = 1
+        self.flags[pos_key(x, y)] = 1
 
     def remove_flag(self, x, y, call_js=None):
-        pos = "{},{}".format(x, y)
-        del self.flags[pos]
+        del self.flags[pos_key(x, y)]
         self.js_call(call_js, 'remove_flag', [x, y])
 
     def add_description(self, desc):
@@ -294,8 +410,7 @@ class WorldModel():
     def add_object(self, x, y, obj_name, val, call_js=None):
         obj = {}
         obj[obj_name] = val
-        pos = "{},{}".format(x, y)
-        self.objects[pos] = obj
+        self.objects[pos_key(x, y)] = obj
 
         # js_call
         self.js_call(call_js, "add_object", [x, y, obj_name, val])
@@ -349,12 +464,45 @@ class WorldModel():
         return [self.rows, self.cols]
 
     def is_clear(self, x, y, dir):
-        cell = self.cells[x - 1][y - 1]
-        return not cell.has_block(dir)
+        if dir.__class__ is not int:
+            dir = Direction.get_dir(dir).value
+        return not self.blocked.get(x - 1, y - 1) >> dir & 1
+
+    def distance(self, x, y, dir):
+        """Number of cells that can be crossed from x, y towards `dir`
+        before a wall or the border."""
+        if dir.__class__ is not int:
+            dir = Direction.get_dir(dir).value
+        if dir == 0:
+            return self.row_stops.next(y, x, self.cols) - x
+        if dir == 1:
+            return self.col_stops.next(x, y, self.rows) - y
+        if dir == 2:
+            return x - self.row_stops.prev(y, x, 0) - 1
+        return y - self.col_stops.prev(x, y, 0) - 1
+
+    def flags_on_path(self, x, y, dir, steps):
+        """Flags of the `steps` cells after x, y towards `dir`, in the order
+        they are reached."""
+        dx, dy = ((1, 0), (0, 1), (-1, 0), (0, -1))[dir]
+        if len(self.flags) < steps:
+            found = []
+            for key in self.flags:
+                fx, fy = key_pos(key)
+                i = (fx - x) * dx + (fy - y) * dy
+                if 0 < i <= steps and (fx - x, fy - y) == (dx * i, dy * i):
+                    found.append((i, fx, fy))
+            return [(fx, fy) for i, fx, fy in sorted(found)]
+        return [(x + dx * i, y + dy * i) for i in range(1, steps + 1)
+                if pos_key(x + dx * i, y + dy * i) in self.flags]
 
     def done(self, bot):
         return all(goal.is_completed(bot, self) for goal in self.goals)
 
+    def goal_results(self, bot):
+        return [{'goal': goal.msg(), 'completed': goal.is_completed(bot, self)}
+                for goal in self.goals]
+
     def check(self, bot):
         if self.is_checked == True:
             raise RuntimeError("Already Checked once.")
@@ -362,9 +510,9 @@ class WorldModel():
         for goal in self.goals:
             if not goal.is_completed(bot, self):
                 sucess = False
-                print_error(goal.msg())
+                bot.world.print_error(goal.msg())
             else:
-                print_success(goal.msg())
+                bot.world.print_success(goal.msg())
         self.is_checked = True
         return sucess
 
@@ -375,20 +523,85 @@ class WorldModel():
             'floating': self.floating
         }
 
-    def render_all(self, js_call=None):
+    @staticmethod
+    def sparse_json(grid, offset=0):
+        # "x,y" keyed like objects and messages, only the set entries
+        return {"{},{}".format(x + offset, y + offset): val
+                for x, y, val in grid.items()}
+
+    @staticmethod
+    def in_block(store, x0, y0, w, h):
+        block = {}
+        for key, val in store.items():
+            x, y = key_pos(key)
+            if x0 <= x < x0 + w and y0 <= y < y0 + h:
+                block["{},{}".format(x, y)] = val
+        return block
+
+    def render_chunk(self, x0, y0, w, h):
+        """Walls, tiles, objects, messages and flags of the w x h block of
+        cells whose bottom left cell is x0, y0."""
+        # a block owns the east and north walls of its cells, and the west
+        # and south walls along the world border
+        wx0 = 0 if x0 == 1 else x0
+        wy0 = 0 if y0 == 1 else y0
+        vwalls = self.vwalls.region(wx0, y0, x0 + w - wx0, h)
+        hwalls = self.hwalls.region(x0, wy0, w, y0 + h - wy0)
+        tiles = self.tiles.region(x0 - 1, y0 - 1, w, h)
+        return {
+            "x": x0, "y": y0, "w": w, "h": h,
+            "vwalls": {"{},{}".format(x, y): val for x, y, val in vwalls},
+            "hwalls": {"{},{}".format(x, y): val for x, y, val in hwalls},
+            "tiles": {"{},{}".format(x + 1, y + 1): val for x, y, val in tiles},
+            "objects": self.in_block(self.objects, x0, y0, w, h),
+            "messages": self.in_block(self.messages, x0, y0, w, h),
+            "flags": self.in_block(self.flags, x0, y0, w, h),
+        }
+
+    def first_viewport(self, zoom=1.0):
+        # the chunks around the first robot that fit the view at `zoom`
+        chunks = -(-int(VIEWPORT_CELLS / (zoom or 1.0)) // CHUNK_SIZE)
+        x, y = (self.robots[0].x, self.robots[0].y) if self.robots else (1, 1)
+        x0 = max(0, (x - 1) // CHUNK_SIZE - chunks // 2) * CHUNK_SIZE + 1
+        y0 = max(0, (y - 1) // CHUNK_SIZE - chunks // 2) * CHUNK_SIZE + 1
+        size = chunks * CHUNK_SIZE
+        return [x0, y0, min(size, self.cols - x0 + 1),
+                min(size, self.rows - y0 + 1)]
+
+    def render_all(self, js_call=None, zoom=1.0):
+        properties = self.world_properties()
+        if self.sparse:
+            # large worlds only ship the first viewport, the view requests
+            # the other chunks as it is panned
+            chunk = self.render_chunk(*self.first_viewport(zoom))
+            properties['chunk_size'] = CHUNK_SIZE
+            properties['viewport'] = [chunk["x"], chunk["y"],
+                                      chunk["w"], chunk["h"]]
+        else:
+            # dense worlds keep the nested lists, replay pages load the
+            # released frontend which only draws those
+            chunk = {
+                "vwalls": self.vwalls.tolist(),
+                "hwalls": self.hwalls.tolist(),
+                "tiles": self.tiles.tolist(),
+                "objects": keyed_json(self.objects),
+                "messages": keyed_json(self.messages),
+                "flags": keyed_json(self.flags),
+            }
+
         self.js_call(js_call, 'draw_all', [
-            self.world_properties(),
+            properties,
             self.ui_id,
             self.rows,
             self.cols,
-            self.vwalls,
-            self.hwalls,
+            chunk["vwalls"],
+            chunk["hwalls"],
             [r.toJSON() for r in self.robots],
-            self.objects,
+            chunk["objects"],
             self.tilemap,
-            self.tiles,
-            self.messages,
-            self.flags,
+            chunk["tiles"],
+            chunk["messages"],
+            chunk["flags"],
             [x.msg() for x in self.goals],
             [{"obj_name": x.obj_name, "x": x.x, "y": x.y, "val": x.val}
                 for x in self.drop_goals()]
@@ -2,18 +2,78 @@ import random
 from .goal import Goal
 
 
+class VariantRandom(random.Random):
+    """Random source that replays the draws of one world variant.
+
+    Every `choice`/`randint` call of the parser is a choice point. The first
+    points take their option index from `choices`, later ones are drawn from
+    the seeded generator. `arities` and `picked` record the number of options
+    and the index taken at each point.
+    """
+
+    def __init__(self, seed=0, choices=()):
+        super().__init__(seed)
+        self.choices = list(choices)
+        self.arities = []
+        self.picked = []
+
+    def pick(self, n):
+        point = len(self.arities)
+        if point < len(self.choices):
+            index = self.choices[point] % n
+        else:
+            index = self.randrange(n)
+        self.arities.append(n)
+        self.picked.append(index)
+        return index
+
+    def choice(self, seq):
+        return seq[self.pick(len(seq))]
+
+    def randint(self, a, b):
+        return a + self.pick(b - a + 1)
+
+
 class WorldParser:
-    def __init__(self, world, config):
+    def __init__(self, world, config, rng=None):
         self.world = world
         self.config = config
+        # every random draw of a world goes through `rng`, the `random`
+        # module unless a seeded `random.Random` is given
+        self.rng = rng if rng is not None else random
 
     @staticmethod
-    def parse(world, config):
-        parser = WorldParser(world, config)
+    def parse(world, config, rng=None):
+        parser = WorldParser(world, config, rng)
         parser.parse_world()
         return parser
 
+    @staticmethod
+    def compile(config, rng=None):
+        """Parses `config` once into an immutable `WorldTemplate`, random
+        fields drawn from `rng`, for building many identical worlds."""
+        from .world_model import WorldModel
+        from .world_template import WorldTemplate
+        world = WorldModel()
+        WorldParser(world, config, rng).parse_world()
+        return WorldTemplate(world)
+
+    @staticmethod
+    def is_random(value):
+        return isinstance(value, list) or \
+            (isinstance(value, str) and "-" in value)
+
+    def has_fixed_layout(self):
+        """True when the layout of the level is the same on every parse."""
+        return not (self.is_random(self.config["rows"]) or
+                    self.is_random(self.config["cols"]))
+
     def parse_world(self):
+        self.parse_layout()
+        self.parse_contents()
+
+    def parse_layout(self):
+        # the parts without random draws when the dimensions are fixed
         self.parse_dimensions()
         self.parse_project_title()
         self.parse_scene_config()
@@ -21,11 +81,13 @@ class WorldParser:
         self.parse_walls()
         self.parse_tiles()
         self.parse_messages()
+        self.parse_flags()
+        self.parse_description()
+
+    def parse_contents(self):
         self.parse_robots()
         self.parse_objects()
-        self.parse_flags()
         self.parse_goals()
-        self.parse_description()
 
     def parse_scene_config(self):
         self.world.border_color = self.config.get('border_color', 'darkred'),
@@ -79,11 +141,11 @@ class WorldParser:
     def parse_val(self, value):
         if isinstance(value, list):
             #eg [1,3,5]
-            return random.choice(value)
+            return self.rng.choice(value)
         elif isinstance(value, str) and "-" in value:
             # eg "1-10"
             min_val, max_val = map(int, value.split("-"))
-            return random.randint(min_val, max_val)
+            return self.rng.randint(min_val, max_val)
         else:
             return int(value)
 
@@ -94,7 +156,7 @@ class WorldParser:
             y = robot.get('y')
             positions = robot.get('possible_initial_positions', None)
             if positions is not None and isinstance(positions, list) and len(positions) > 0:
-                x, y = random.choice(positions)
+                x, y = self.rng.choice(positions)
 
             self.world.add_robot(x, y, robot.get(
                 '_orientation', 0), robot.get('_traceColor', 'red'))
@@ -109,7 +171,7 @@ class WorldParser:
     def add_position_goal(self, goals):
         position_goal = goals.get('possible_final_positions', [])
         if len(position_goal) > 0:
-            x, y = random.choice(position_goal)
+            x, y = self.rng.choice(position_goal)
             self.world._add_goal('position', {"x": x, "y": y})
         elif goals.get('position', None) is not None:
             pos = goals.get('position', None)
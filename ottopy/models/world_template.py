@@ -0,0 +1,84 @@
+from .grid import CellGrid
+from .robot_model import RobotModel
+from .world_model import Cell, WorldModel
+
+
+class WorldTemplate():
+    """A parsed level frozen for cheap instantiation.
+
+    Worlds made by `instantiate` share the wall, tile, editable and blocked
+    grids and the wall stops of the template until they first write them
+    (``build_wall``, ``remove_wall``, ...), and share the goals and
+    description outright. The small dict stores, objects, flags, messages
+    and the tilemap, are copied, along with new robot models.
+
+    A template must not be changed once made; it takes over the storage of
+    the world it is made from.
+
+    Examples
+    --------
+    >>> template = WorldParser.compile(config)
+    >>> world = template.instantiate(options={'MAX_INSTRUCTION_COUNT': 100})
+    """
+
+    def __init__(self, world):
+        self.rows = world.rows
+        self.cols = world.cols
+        self.sparse = world.sparse
+        self.hwalls = world.hwalls
+        self.vwalls = world.vwalls
+        self.tiles = world.tiles
+        self.editable = world.editable
+        self.blocked = world.blocked
+        self.row_stops = world.row_stops
+        self.col_stops = world.col_stops
+        self.tilemap = getattr(world, 'tilemap', None)
+        self.messages = world.messages
+        self.flags = world.flags
+        self.objects = world.objects
+        self.robots = [(r.x, r.y, r.orientation, r.traceColor)
+                       for r in world.robots]
+        self.goals = tuple(world.goals)
+        self.border_color = world.border_color
+        self.grid_line_color = world.grid_line_color
+        self.project_title = world.project_title
+        self.description = world.description
+
+        # writes now go to the grids shared with the instances
+        self.hwalls.on_change = None
+        self.vwalls.on_change = None
+
+    def apply(self, world):
+        """Gives `world` the layout and contents of the template."""
+        world.rows = self.rows
+        world.cols = self.cols
+        world.sparse = self.sparse
+        world.hwalls = self.hwalls.share()
+        world.vwalls = self.vwalls.share()
+        world.hwalls.on_change = world.wall_changed
+        world.vwalls.on_change = world.wall_changed
+        world.tiles = self.tiles.share()
+        world.editable = self.editable.share()
+        world.blocked = self.blocked.share()
+        world.row_stops = self.row_stops.share()
+        world.col_stops = self.col_stops.share()
+        world.wall_version = 0
+        world.cells = CellGrid(world, Cell)
+        if self.tilemap is not None:
+            world.tilemap = dict(self.tilemap)
+
+        world.messages = dict(self.messages)
+        world.flags = dict(self.flags)
+        # the object counts of a cell are replaced, never updated in place
+        world.objects = dict(self.objects)
+        world.robots = [RobotModel(*robot) for robot in self.robots]
+        world.goals = list(self.goals)
+        world.border_color = self.border_color
+        world.grid_line_color = self.grid_line_color
+        world.project_title = self.project_title
+        world.description = self.description
+
+    def instantiate(self, initFn=None, options={}):
+        """Builds a new `WorldModel` of the level, like
+        ``WorldModel(path, initFn, options)`` without parsing anything."""
+        return WorldModel(None, initFn, options, template=self)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Optional instrumentation of robots.
+
+A `Profiler` attached to a `Robot` counts the calls and the time spent in
+each of its sensors and actions, the visits of every cell and the ratio of
+sensor to action calls. Only the calls made by the program are counted, not
+the calls robot methods make to each other.
+
+Attaching shadows the methods on the robot instance, so robots that are
+not profiled run the plain class methods with no overhead at all. Robots
+are profiled when their world has the ``profile`` option::
+
+    bot = get_bot("worlds/level1.json", options={"profile": True})
+    ...
+    bot.stats.profile()
+"""
+
+import functools
+import time as _time
+
+from .models.grid import key_pos, keyed_json, pos_key
+
+SENSORS = (
+    "front_is_clear", "right_is_clear", "wall_in_front", "wall_on_right",
+    "distance_ahead", "message_here", "object_here", "on_object", "on_flag",
+    "has_object", "carries_object", "carries_flag", "basket", "at_goal",
+    "done",
+)
+ACTUATORS = (
+    "move", "move_until_blocked", "turn_left", "take", "put", "build_wall",
+    "remove_wall", "read_message", "report", "set_trace", "set_speed",
+)
+
+# most visited cells listed in a report
+HOT_CELLS = 5
+
+
+class Profiler():
+    """Call counts, times and cell visits of one robot."""
+
+    def __init__(self, robot, clock=_time.perf_counter):
+        self.robot = robot
+        self.clock = clock
+        # name -> [count, seconds]
+        self.calls = {}
+        self.visits = {pos_key(robot.x, robot.y): 1}
+        self.active = False
+        for name in SENSORS + ACTUATORS:
+            setattr(robot, name, self.wrap(name, getattr(robot, name)))
+        robot.profiler = self
+
+    def wrap(self, name, method):
+        robot = self.robot
+        clock = self.clock
+
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            if self.active:
+                return method(*args, **kwargs)
+            x, y = robot.x, robot.y
+            self.active = True
+            started = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = clock() - started
+                self.active = False
+                entry = self.calls.get(name, None)
+                if entry is None:
+                    entry = self.calls[name] = [0, 0.0]
+                entry[0] += 1
+                entry[1] += elapsed
+                if robot.x != x or robot.y != y:
+                    self.visit(x, y, robot.x, robot.y)
+
+        return profiled
+
+    def visit(self, x0, y0, x1, y1):
+        # moves are straight, every cell after the start is visited
+        dx = (x1 > x0) - (x1 < x0)
+        dy = (y1 > y0) - (y1 < y0)
+        x, y = x0, y0
+        while (x, y) != (x1, y1):
+            x += dx
+            y += dy
+            key = pos_key(x, y)
+            self.visits[key] = self.visits.get(key, 0) + 1
+
+    def count(self, names):
+        return sum(self.calls[name][0] for name in names if name in self.calls)
+
+    def report(self):
+        """The profile as a json serializable dict.
+
+        Examples
+        --------
+        >>> bot.stats.profile()["calls"]["move"]
+        {'count': 4, 'time': 3.1e-05}
+        >>> bot.stats.profile()["sensor_actuator_ratio"]
+        1.25
+        """
+        sensors = self.count(SENSORS)
+        actuators = self.count(ACTUATORS)
+        hot = sorted(self.visits.items(), key=lambda item: -item[1])
+        return {
+            "calls": {name: {"count": count, "time": round(seconds, 6)}
+                      for name, (count, seconds) in sorted(self.calls.items())},
+            "sensor_calls": sensors,
+            "actuator_calls": actuators,
+            "sensor_actuator_ratio": round(sensors / actuators, 3)
+            if actuators else None,
+            "time": round(sum(t for _, t in self.calls.values()), 6),
+            "instructions": self.robot.world_model.instruction_count,
+            "visits": keyed_json(self.visits),
+            "hot_cells": [list(key_pos(key)) + [n]
+                          for key, n in hot[:HOT_CELLS]],
+        }
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Replay files for `Maze(gen_html=True)`.
+
+Steps are streamed through one buffered handle per file and grouped into
+``<script>steps = steps.concat([...])</script>`` blocks, one block per flush,
+instead of reopening the file for a script tag per step.
+"""
+
+import atexit
+import json
+import os
+import threading
+
+BLOCK_START = "<script>steps = steps.concat(["
+BLOCK_END = "])</script>\n"
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+class ReplayWriter():
+    """Buffered writer of the steps of a run.
+
+    Writes are serialized with a lock so several `Maze` instances can share
+    the same replay file.
+    """
+
+    def __init__(self, path, buffering=64 * 1024):
+        self.path = path
+        self.buffering = buffering
+        self.lock = threading.Lock()
+        self.handle = None
+        self.in_block = False
+
+    def start(self, header):
+        """Truncates the file and writes the page `header`."""
+        with self.lock:
+            self._close()
+            self.handle = open(self.path, 'w', buffering=self.buffering)
+            self.handle.write(header)
+
+    def write(self, step):
+        self.write_text(json.dumps(step, separators=(',', ':')))
+
+    def write_event(self, event):
+        """Event bus sink, writes the encoding the event already has."""
+        self.write_text(event.encode())
+
+    def write_text(self, text):
+        with self.lock:
+            if self.handle is None:
+                self.handle = open(self.path, 'a', buffering=self.buffering)
+
+            if self.in_block:
+                self.handle.write(',')
+            else:
+                self.handle.write(BLOCK_START)
+                self.in_block = True
+            self.handle.write(text)
+
+    def flush(self):
+        """Ends the current block and pushes it to disk."""
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+    def _flush(self):
+        if self.handle is None:
+            return
+        if self.in_block:
+            self.handle.write(BLOCK_END)
+            self.in_block = False
+        self.handle.flush()
+
+    def _close(self):
+        self._flush()
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+
+def get_writer(path='last_run.html'):
+    """Returns the writer shared by every maze replaying into `path`."""
+    key = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(key, None)
+        if writer is None:
+            writer = ReplayWriter(key)
+            _writers[key] = writer
+        return writer
+
+
+@atexit.register
+def close_all():
+    with _writers_lock:
+        for writer in _writers.values():
+            writer.close()
@@ -1,4 +1,6 @@
-from .models.world_model import print_success, print_error
+from .models.grid import pos_key
+from .profiler import Profiler
+
 _directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]
 
 dir_names = ["east", "north", "west", "south"]
@@ -16,6 +18,13 @@ class Stats():
             'basket': self.bot.basket()
         }
 
+    def profile(self):
+        """Call counts and times, cell visits and instruction mix of the
+        robot, None unless its world has the ``profile`` option."""
+        if self.bot.profiler is None:
+            return None
+        return self.bot.profiler.report()
+
 
 class Robot():
     def __init__(self, index, robot_model, world):
@@ -31,6 +40,9 @@ class Robot():
         self.move_count = 0
         self.stats = Stats(self)
         self.flag_count = 0
+        self.profiler = None
+        if self.world_model.options.get('profile', False):
+            Profiler(self)
 
     @property
     def x(self):
@@ -78,21 +90,68 @@ class Robot():
         >>> bot.move(10)
         """
         self.world_model.incr_instruction(step)
-        for x in range(step):
-            self._move()
-        self.world.js_call('move_to', [self.index, self.x, self.y])
-
-    def _move(self):
-        if self.front_is_clear():
-            xx, yy = _directions[self.dir]
-            self.x += xx
-            self.y += yy
-            self._pick_flag()
-            self.move_count += 1
-        else:
+        free = self.world_model.distance(self.x, self.y, self.dir)
+        self._advance(min(step, free))
+        if step > free:
             self.world.js_call('move_to', [self.index, self.x, self.y])
-            print_error("Opps You Hit the walls")
+            self.world.print_error("Opps You Hit the walls")
             raise RuntimeError('Opps You Hit the walls')
+        self.world.js_call('move_to', [self.index, self.x, self.y])
+
+    def _advance(self, steps):
+        # jumps `steps` free cells ahead, picking the flags on the way
+        if steps <= 0:
+            return
+        path = self.world_model.flags_on_path(self.x, self.y, self.dir, steps)
+        for x, y in path:
+            self.flag_count += 1
+            self.world_model.remove_flag(x, y, self.world.js_call)
+        xx, yy = _directions[self.dir]
+        self.x += xx * steps
+        self.y += yy * steps
+        self.move_count += steps
+
+    def distance_ahead(self):
+        """Counts the free cells in front of the robot, up to the next wall.
+
+        Returns
+        -------
+        int
+            Number of cells the robot can move forward.
+
+        Examples
+        --------
+        >>> bot.distance_ahead()
+        3
+        """
+        return self.world_model.distance(self.x, self.y, self.dir)
+
+    def move_until_blocked(self, limit=None):
+        """Moves forward until the robot faces a wall.
+           Costs one instruction per cell moved, and at least one.
+
+        Parameters
+        ---------
+        limit : int
+        stop after this many cells even without a wall (default value is None)
+
+        Returns
+        -------
+        int
+            Number of cells moved.
+
+        Examples
+        --------
+        >>> bot.move_until_blocked()
+        3
+        """
+        steps = self.distance_ahead()
+        if limit is not None:
+            steps = min(steps, limit)
+        self.world_model.incr_instruction(max(steps, 1))
+        self._advance(steps)
+        self.world.js_call('move_to', [self.index, self.x, self.y])
+        return steps
 
     def front_is_clear(self):
         """Checks if there is no wall in front of the robot (in the direction it is facing).
@@ -201,7 +260,7 @@ class Robot():
 
         """
         self.count_report.append(msg)
-        print_success("{}".format(msg))
+        self.world.print_success("{}".format(msg))
 
     def cell(self):
         return self.world_model.cells[self.x - 1][self.y - 1]
@@ -221,7 +280,7 @@ class Robot():
             if cell.has_goal_wall(self.dir):
                 cell.add_wall(self.dir, self.world.js_call)
         else:
-            print_error("Wall Already exists")
+            self.world.print_error("Wall Already exists")
             raise RuntimeError("Wall Already exists")
 
     def remove_wall(self):
@@ -237,7 +296,7 @@ class Robot():
         if not self.front_is_clear():
             self.cell().remove_wall(self.dir, self.world.js_call)
         else:
-            print_error("No Wall exists")
+            self.world.print_error("No Wall exists")
             raise RuntimeError("No Wall exists")
 
     def set_trace(self, color='red'):
@@ -323,7 +382,7 @@ class Robot():
         "apple"
         """
         self.world_model.incr_instruction()
-        k = "{},{}".format(self.x, self.y)
+        k = pos_key(self.x, self.y)
         obj = self.world_model.objects.get(k, None)
         collection = self.collections.get(k, None)
         if obj is not None:
@@ -397,17 +456,12 @@ class Robot():
         return False
 
     def on_flag(self):
-        k = "{},{}".format(self.x, self.y)
+        k = pos_key(self.x, self.y)
         return self.world_model.flags.get(k, 0) == 1
 
     def carries_flag(self):
         return self.flag_count > 1
 
-    def _pick_flag(self):
-        if self.on_flag():
-            self.flag_count += 1
-            self.world_model.remove_flag(self.x, self.y, self.world.js_call)
-
     def put(self):
         cell = self.cell()
         if not cell.editable["drop"]:
@@ -424,7 +478,7 @@ class Robot():
                 else:
                     del collection[o_name]
                 self.collections[ck] = collection
-                k = "{},{}".format(self.x, self.y)
+                k = pos_key(self.x, self.y)
                 obj_here = self.world_model.objects.get(
                     k, {}).get(o_name, 0) + 1
                 self.world_model.add_object(
@@ -434,7 +488,7 @@ class Robot():
 
     def on_object(self, obj_type=None):
         self.world_model.incr_instruction()
-        k = "{},{}".format(self.x, self.y)
+        k = pos_key(self.x, self.y)
         obj = self.world_model.objects.get(k, None)
         valid_type = True
         if obj is not None and obj_type is not None:
@@ -463,7 +517,7 @@ class Robot():
             raise RuntimeError("Can't Pick From this Cell")
 
         if self.on_object(obj_type):
-            ck = "{},{}".format(self.x, self.y)
+            ck = pos_key(self.x, self.y)
 
             obj = self.world_model.objects.get(ck, None)
             if obj is not None:
@@ -481,6 +535,6 @@ class Robot():
                         self.world.js_call('update_object', [
                                            self.x, self.y, val - picked])
         else:
-            print_error("No Items to Pick.")
+            self.world.print_error("No Items to Pick.")
             raise RuntimeError("No Items to Pick.")
             self.world.js_call('error', ["No Items to Pick"])
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Lockstep execution of the robots of a multi-robot world.
+
+`Scheduler` runs one program per robot in rounds. A program is an ``async``
+function of its robot which awaits every action; each await ends the turn of
+the robot, so in a round every robot makes `actions_per_round` actions
+(1 for lockstep, more for time slices) before the next one goes. A shared
+controller can instead be called once per round to act for all robots.
+
+Robots can not enter a cell held by another robot; the holders are kept in
+an occupancy map keyed like the other cell stores. All the frontend calls of
+a round are sent as one frame.
+
+Examples
+--------
+>>> async def program(bot):
+...     while not bot.done():
+...         if bot.front_is_clear():
+...             await bot.move()
+...         else:
+...             await bot.turn_left()
+>>> Scheduler(maze).run(program)
+{'rounds': 12, 'finished': [0, 1], 'errors': {}, 'unfinished': []}
+"""
+
+import asyncio
+
+from .models.grid import pos_key
+from .robot import _directions
+
+
+class Step():
+    """What an action of a `LockstepRobot` returns. The action is already
+    done; awaiting it ends the turn of the robot and gives its result."""
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def __await__(self):
+        yield self
+        return self.value
+
+
+class LockstepRobot():
+    """A `Robot` driven by a `Scheduler`: sensors answer at once, actions
+    return a `Step` and moves are checked against the other robots."""
+
+    def __init__(self, robot, scheduler):
+        self.robot = robot
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        # sensors and properties of the wrapped robot
+        return getattr(self.robot, name)
+
+    def move(self, step=1):
+        """`Robot.move`, raising before moving when another robot is in
+        the way."""
+        robot = self.robot
+        ahead = min(step, robot.distance_ahead())
+        if self.scheduler.free_ahead(robot, ahead) < ahead:
+            robot.world.print_error("Another robot is in the way")
+            raise RuntimeError("Another robot is in the way")
+        return self.scheduler.moved(robot, robot.move, step)
+
+    def move_until_blocked(self):
+        """`Robot.move_until_blocked`, other robots blocking like walls."""
+        robot = self.robot
+        limit = self.scheduler.free_ahead(robot, robot.distance_ahead())
+        return self.scheduler.moved(robot, robot.move_until_blocked, limit)
+
+    def turn_left(self):
+        return Step(self.robot.turn_left())
+
+    def take(self, obj_type=None):
+        return Step(self.robot.take(obj_type))
+
+    def put(self):
+        return Step(self.robot.put())
+
+    def build_wall(self):
+        return Step(self.robot.build_wall())
+
+    def remove_wall(self):
+        return Step(self.robot.remove_wall())
+
+    def read_message(self, wait_For=5):
+        return Step(self.robot.read_message(wait_For))
+
+    def set_trace(self, color='red'):
+        return Step(self.robot.set_trace(color))
+
+    def set_speed(self, speed=0.1):
+        return Step(self.robot.set_speed(speed))
+
+
+class Scheduler():
+    """Runs the robots of a maze in rounds.
+
+    Parameters
+    ----------
+    maze : Maze or HeadlessMaze
+        maze whose robots are run.
+    actions_per_round : int
+        actions of every robot per round, 1 for lockstep.
+    max_rounds : int
+        rounds after which the programs still running are stopped.
+    """
+
+    def __init__(self, maze, actions_per_round=1, max_rounds=10000):
+        self.maze = maze
+        self.actions_per_round = actions_per_round
+        self.max_rounds = max_rounds
+        self.rounds = 0
+        self.bots = [LockstepRobot(robot, self) for robot in maze.robots]
+        self.occupied = {}
+        for robot in maze.robots:
+            self.occupied[pos_key(robot.x, robot.y)] = robot.index
+
+    def bot(self, bot_index=0):
+        return self.bots[bot_index]
+
+    def free_ahead(self, robot, limit):
+        """Cells `robot` can move forward before the cell of another robot,
+        at most `limit`."""
+        dx, dy = _directions[robot.dir]
+        for i in range(1, limit + 1):
+            other = self.occupied.get(pos_key(robot.x + dx * i,
+                                              robot.y + dy * i), None)
+            if other is not None and other != robot.index:
+                return i - 1
+        return limit
+
+    def moved(self, robot, action, *args):
+        start = pos_key(robot.x, robot.y)
+        try:
+            return Step(action(*args))
+        finally:
+            if self.occupied.get(start, None) == robot.index:
+                del self.occupied[start]
+            self.occupied[pos_key(robot.x, robot.y)] = robot.index
+
+    def run(self, programs):
+        """Runs `programs`, one ``async`` function per robot (a single one
+        is run by every robot), until they all end or `max_rounds`.
+
+        Returns
+        -------
+        dict
+            the rounds played, the robots whose program ended, the errors
+            of the programs that raised by robot index and the robots still
+            running at `max_rounds`.
+        """
+        if callable(programs):
+            programs = [programs] * len(self.bots)
+        tasks = {}
+        for i, program in enumerate(programs):
+            tasks[i] = program(self.bots[i])
+            if not asyncio.iscoroutine(tasks[i]):
+                raise TypeError("programs must be async functions")
+
+        finished = []
+        errors = {}
+        while len(tasks) > 0 and self.rounds < self.max_rounds:
+            with self.maze.batching():
+                for i in list(tasks):
+                    for _ in range(self.actions_per_round):
+                        try:
+                            step = tasks[i].send(None)
+                        except StopIteration:
+                            finished.append(i)
+                            del tasks[i]
+                            break
+                        except Exception as e:
+                            errors[i] = "{}: {}".format(type(e).__name__, e)
+                            del tasks[i]
+                            break
+                        if not isinstance(step, Step):
+                            tasks.pop(i).close()
+                            raise RuntimeError(
+                                "programs can only await robot actions")
+            self.rounds += 1
+
+        for task in tasks.values():
+            task.close()
+        return {"rounds": self.rounds, "finished": finished,
+                "errors": errors, "unfinished": sorted(tasks)}
+
+    def run_controller(self, controller):
+        """Calls ``controller(bots, round)`` once per round, until it
+        returns False or `max_rounds`. Its actions need not be awaited.
+
+        Returns
+        -------
+        int
+            the rounds played.
+        """
+        while self.rounds < self.max_rounds:
+            with self.maze.batching():
+                going = controller(self.bots, self.rounds)
+            self.rounds += 1
+            if going is False:
+                break
+        return self.rounds
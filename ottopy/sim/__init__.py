@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Pure simulation API.
+
+Everything needed to load levels, run robots and score them headlessly,
+importable without any Jupyter dependency::
+
+    from ottopy.sim import HeadlessMaze, load_world
+
+    bot = HeadlessMaze(load_world("worlds/level1.json")).bot()
+    bot.move()
+"""
+
+from ..events import Event, EventBus, EventMetrics
+from ..headless import HeadlessMaze, get_bot
+from ..models.goal import Goal
+from ..models.levels import LevelCache, level_cache, load_config, \
+    load_template, load_world
+from ..models.robot_model import RobotModel
+from ..models.world_model import Cell, Direction, WallType, WorldModel
+from ..models.world_parser import VariantRandom, WorldParser
+from ..models.world_template import WorldTemplate
+from ..robot import Robot
+from ..solver import Solver, efficiency, get_solver, optimal_instructions
+
+__all__ = [
+    'Cell', 'Direction', 'Event', 'EventBus', 'EventMetrics', 'Goal',
+    'HeadlessMaze', 'LevelCache', 'Robot', 'RobotModel', 'Solver',
+    'VariantRandom', 'WallType', 'WorldModel', 'WorldParser',
+    'WorldTemplate', 'efficiency', 'get_bot', 'get_solver', 'level_cache',
+    'load_config', 'load_template', 'load_world', 'optimal_instructions',
+]
@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Shortest paths and optimal instruction counts.
+
+The state of a robot is its cell and direction. ``move`` crosses one free
+cell and ``turn_left`` rotates in place, one instruction each, so a breadth
+first search over the states gives the cheapest instruction sequence between
+two states; a right turn costs three. Distance fields are cached per world
+and dropped as soon as a wall changes.
+
+`optimal_instructions` plans a whole level: the cells of the pick, drop and
+wall goals are visited in the cheapest order, exactly for a few goals and
+greedily for many, before ending on the position goal.
+"""
+
+import weakref
+
+from .models.goal import DropGoal, ObjectGoal, PositionGoal, WallGoal
+from .models.grid import key_pos
+from .models.world_model import Direction
+
+_directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+
+# instructions spent at a stop per object or wall
+TAKE_COST = 2  # take() and the on_object() check it makes
+PUT_COST = 1
+BUILD_WALL_COST = 1
+
+# up to this many stops every visiting order is considered
+MAX_EXACT_STOPS = 8
+
+_solvers = weakref.WeakKeyDictionary()
+
+
+def get_solver(world):
+    """Returns the `Solver` of `world`, shared so distance fields are only
+    computed once per world."""
+    solver = _solvers.get(world, None)
+    if solver is None:
+        solver = _solvers[world] = Solver(world)
+    return solver
+
+
+def optimal_instructions(world, robot_index=0):
+    return get_solver(world).optimal_instructions(robot_index)
+
+
+def efficiency(optimal, used):
+    """Ratio of the optimal to the used instruction count, 1.0 is best."""
+    if optimal is None or not used:
+        return None
+    return round(min(optimal / used, 1.0), 3)
+
+
+class Stop():
+    """A cell to visit, the direction to face there (None for any), the
+    instructions spent there and the bit mask of the stops to visit first."""
+
+    def __init__(self, x, y, cost, dir=None, after=0):
+        self.x = x
+        self.y = y
+        self.cost = cost
+        self.dir = dir
+        self.after = after
+
+    def dirs(self):
+        return range(4) if self.dir is None else [self.dir]
+
+    def ready(self, visited):
+        return (visited & self.after) == self.after
+
+
+class Solver():
+    """Shortest paths over the ``(x, y, direction)`` states of a world.
+
+    Examples
+    --------
+    >>> solver = get_solver(world)
+    >>> solver.path((1, 1, 0), 3, 2)
+    ['move', 'move', 'turn_left', 'move']
+    >>> solver.optimal_instructions()
+    12
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.version = world.wall_version
+        self.fields = {}
+
+    def field(self, x, y, dir):
+        """Instruction counts from the state x, y, dir to every reachable
+        state, keyed by ``(x, y, dir)``."""
+        if self.version != self.world.wall_version:
+            self.fields = {}
+            self.version = self.world.wall_version
+        start = (x, y, dir)
+        dist = self.fields.get(start, None)
+        if dist is None:
+            dist = self.fields[start] = self.search(start)
+        return dist
+
+    def search(self, start):
+        is_clear = self.world.is_clear
+        dist = {start: 0}
+        frontier = [start]
+        cost = 0
+        while frontier:
+            cost += 1
+            reached = []
+            for x, y, d in frontier:
+                turned = (x, y, (d + 1) % 4)
+                if turned not in dist:
+                    dist[turned] = cost
+                    reached.append(turned)
+                if is_clear(x, y, d):
+                    dx, dy = _directions[d]
+                    moved = (x + dx, y + dy, d)
+                    if moved not in dist:
+                        dist[moved] = cost
+                        reached.append(moved)
+            frontier = reached
+        return dist
+
+    def cost(self, start, x, y, dir=None):
+        """Fewest instructions from the state `start` to the cell x, y,
+        facing `dir` if given. None when the cell can not be reached."""
+        dist = self.field(*start)
+        dirs = range(4) if dir is None else [dir]
+        costs = [dist[(x, y, d)] for d in dirs if (x, y, d) in dist]
+        return min(costs) if costs else None
+
+    def path(self, start, x, y, dir=None):
+        """Cheapest list of ``"move"``/``"turn_left"`` instructions from the
+        state `start` to the cell x, y, None when it can not be reached."""
+        dist = self.field(*start)
+        dirs = range(4) if dir is None else [Direction.get_dir(dir).value]
+        ends = [(x, y, d) for d in dirs if (x, y, d) in dist]
+        if len(ends) == 0:
+            return None
+
+        state = min(ends, key=dist.get)
+        instructions = []
+        while dist[state] > 0:
+            sx, sy, sd = state
+            prev = (sx, sy, (sd + 3) % 4)
+            if dist.get(prev, None) == dist[state] - 1:
+                instructions.append("turn_left")
+            else:
+                dx, dy = _directions[sd]
+                prev = (sx - dx, sy - dy, sd)
+                instructions.append("move")
+            state = prev
+        return instructions[::-1]
+
+    def reachable(self, x, y):
+        """Cells that can be reached from the cell x, y."""
+        return set((sx, sy) for sx, sy, d in self.field(x, y, 0))
+
+    def allowed(self, x, y, action):
+        # "pick" or "drop" in the cell, as set by `pick_allowed` and
+        # `drop_allowed`
+        return bool(self.world.cells[x - 1][y - 1].editable[action])
+
+    def stops(self, start):
+        """The stops of the pick, drop and wall goals, None when the objects
+        of a drop goal can not be found or an object goal can not be done
+        in a locked cell."""
+        world = self.world
+        left = {}
+        for key, obj in world.objects.items():
+            for name, val in obj.items():
+                left[(key_pos(key), name)] = val
+
+        stops = []
+        for goal in world.goals:
+            if isinstance(goal, ObjectGoal):
+                if not self.allowed(goal.x, goal.y, "pick"):
+                    return None
+                stops.append(Stop(goal.x, goal.y, TAKE_COST * goal.val))
+                cell = ((goal.x, goal.y), goal.obj_name)
+                left[cell] = left.get(cell, 0) - goal.val
+            elif isinstance(goal, WallGoal):
+                cell = world.cells[goal.x - 1][goal.y - 1]
+                for direction in goal.directions:
+                    if not cell.has_block(direction):
+                        stops.append(Stop(goal.x, goal.y, BUILD_WALL_COST,
+                                          Direction.get_dir(direction).value))
+
+        for goal in world.goals:
+            if not isinstance(goal, DropGoal):
+                continue
+            if not self.allowed(goal.x, goal.y, "drop"):
+                return None
+            # the objects are taken from the closest cells holding them
+            # where picking is allowed
+            sources = [(self.cost(start, x, y), (x, y))
+                       for ((x, y), name), val in left.items()
+                       if name == goal.obj_name and val > 0 and
+                       (x, y) != (goal.x, goal.y) and
+                       self.allowed(x, y, "pick")]
+            needed = goal.val
+            after = 0
+            for c, (x, y) in sorted(s for s in sources if s[0] is not None):
+                if needed == 0:
+                    break
+                n = min(needed, left[((x, y), goal.obj_name)])
+                left[((x, y), goal.obj_name)] -= n
+                needed -= n
+                after |= 1 << len(stops)
+                stops.append(Stop(x, y, TAKE_COST * n))
+            if needed > 0:
+                return None
+            stops.append(Stop(goal.x, goal.y, PUT_COST * goal.val,
+                              after=after))
+        return stops
+
+    def optimal_instructions(self, robot_index=0):
+        """Fewest instructions completing the goals of the level.
+
+        Exact for position, pick and wall goals; with drop goals the
+        objects are assumed to come from the closest cells holding them.
+
+        Returns
+        -------
+        int
+            the instruction count, None when a goal can not be reached or
+            the level has goals that are not planned (reporter and flag
+            count goals).
+        """
+        world = self.world
+        robot = world.robots[robot_index]
+        start = (robot.x, robot.y, robot.orientation)
+        final = None
+        for goal in world.goals:
+            if isinstance(goal, PositionGoal):
+                final = (goal.x, goal.y)
+            elif not isinstance(goal, (ObjectGoal, DropGoal, WallGoal)):
+                return None
+
+        stops = self.stops(start)
+        if stops is None:
+            return None
+        if len(stops) <= MAX_EXACT_STOPS:
+            return self.plan_exact(start, stops, final)
+        return self.plan_greedy(start, stops, final)
+
+    def finish(self, state, final):
+        if final is None:
+            return 0
+        return self.cost(state, *final)
+
+    def plan_exact(self, start, stops, final):
+        # best[(visited, i, d)]: cheapest way to have done the stops in the
+        # `visited` mask, ending at stop i facing d
+        n = len(stops)
+        if n == 0:
+            return self.finish(start, final)
+
+        best = {}
+        for i, stop in enumerate(stops):
+            if stop.after:
+                continue
+            for d in stop.dirs():
+                c = self.cost(start, stop.x, stop.y, d)
+                if c is not None:
+                    best[(1 << i, i, d)] = c + stop.cost
+
+        full = (1 << n) - 1
+        result = None
+        for visited in range(1, full + 1):
+            for i in range(n):
+                for d in range(4):
+                    done = best.get((visited, i, d), None)
+                    if done is None:
+                        continue
+                    state = (stops[i].x, stops[i].y, d)
+                    if visited == full:
+                        rest = self.finish(state, final)
+                        if rest is not None and \
+                                (result is None or done + rest < result):
+                            result = done + rest
+                        continue
+                    for j, stop in enumerate(stops):
+                        if visited >> j & 1 or not stop.ready(visited):
+                            continue
+                        for d2 in stop.dirs():
+                            c = self.cost(state, stop.x, stop.y, d2)
+                            if c is None:
+                                continue
+                            key = (visited | 1 << j, j, d2)
+                            total = done + c + stop.cost
+                            if best.get(key, total + 1) > total:
+                                best[key] = total
+        return result
+
+    def plan_greedy(self, start, stops, final):
+        total = 0
+        state = start
+        visited = 0
+        for _ in range(len(stops)):
+            options = []
+            for j, stop in enumerate(stops):
+                if visited >> j & 1 or not stop.ready(visited):
+                    continue
+                for d in stop.dirs():
+                    c = self.cost(state, stop.x, stop.y, d)
+                    if c is not None:
+                        options.append((c + stop.cost, j, d))
+            if len(options) == 0:
+                return None
+            c, j, d = min(options)
+            total += c
+            visited |= 1 << j
+            state = (stops[j].x, stops[j].y, d)
+
+        rest = self.finish(state, final)
+        return None if rest is None else total + rest
@@ -4,6 +4,11 @@
 # Copyright (c) Indresh Vishwakarma.
 # Distributed under the terms of the Modified BSD License.
 
+import json
+import os
+import platform
+import time
+
 import pytest
 
 from ipykernel.comm import Comm
@@ -52,3 +57,181 @@ def mock_comm():
             delattr(Widget, attr)
         else:
             setattr(Widget, attr, value)
+
+
+TEST_WORLD = {
+    "rows": 5,
+    "cols": 5,
+    "walls": {"3,1": ["north"], "4,2": ["east"]},
+    "robots": [{"x": 1, "y": 1}],
+    "objects": {"3,1": {"apple": 2}},
+    "flags": [[2, 1]],
+    "messages": {"1,2": "hello"},
+    "goal": {
+        "position": {"x": 5, "y": 1},
+        "objects": {"3,1": {"apple": 2}}
+    },
+    "description": "Pick the apples and go home"
+}
+
+
+@pytest.fixture
+def world_path(tmp_path):
+    path = tmp_path / "test.json"
+    path.write_text(json.dumps(TEST_WORLD))
+    return str(path)
+
+
+class Benchmark():
+    """Timings of the benchmark tests, best of `repeat` runs.
+
+    Iteration counts are multiplied by ``OTTOPY_BENCH_SCALE`` (default 1).
+    The results are written as JSON to ``OTTOPY_BENCH_JSON`` at the end of
+    the session, to compare releases::
+
+        OTTOPY_BENCH_SCALE=20 OTTOPY_BENCH_JSON=bench.json \
+            pytest ottopy/tests/test_benchmarks.py
+    """
+
+    def __init__(self, scale=1, repeat=5):
+        self.scale = scale
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name, fn, number):
+        """Times `number` calls of `fn`."""
+        number = max(1, int(number * self.scale))
+        best = None
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return self.record(name, ops=number, seconds=round(best, 6),
+                           per_op_us=round(best / number * 1e6, 3),
+                           ops_per_sec=round(number / best) if best else None)
+
+    def record(self, name, **values):
+        self.results[name] = values
+        return values
+
+    def report(self):
+        from .._version import __version__
+        return {
+            "ottopy": __version__,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "scale": self.scale,
+            "repeat": self.repeat,
+            "results": dict(sorted(self.results.items())),
+        }
+
+
+@pytest.fixture(scope="session")
+def bench():
+    benchmark = Benchmark(float(os.environ.get("OTTOPY_BENCH_SCALE", 1)))
+    yield benchmark
+
+    path = os.environ.get("OTTOPY_BENCH_JSON", None)
+    if path:
+        with open(path, "w") as f:
+            json.dump(benchmark.report(), f, indent=2)
+
+
+def percentile(values, q):
+    """Nearest rank `q` percentile of `values`."""
+    ordered = sorted(values)
+    if len(ordered) == 0:
+        return None
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+
+class FrontendStandIn():
+    """Plays the part of `MazeView` for a `Maze` with a mock comm.
+
+    It takes the frames the maze writes to ``current_call``, a call or an
+    array of calls, and runs the calls one at a time like the ``PQueue`` of
+    the view: a call starts `latency` seconds after its frame was sent, once
+    the previous one is done, and takes `render_time` seconds. The last call
+    of a frame is acked through ``method_return`` with the fields the view
+    writes. ``halt`` and calls without a method drop the calls not run yet.
+
+    Acks reach the maze when the kernel dispatches them, so `dispatch`
+    stands in for `flow_control.dispatch_comm_msgs`: the flow control and
+    the waits of the maze pick up every ack that is due, as in a notebook.
+    """
+
+    def __init__(self, maze, latency=0.0, render_time=0.0,
+                 clock=time.perf_counter):
+        self.maze = maze
+        self.latency = latency
+        self.render_time = render_time
+        self.clock = clock
+        # (done_at, sent_at, call, ack) in execution order
+        self.queue = []
+        self.busy_until = 0.0
+        self.frames = 0
+        self.calls = 0
+        self.bytes = 0
+        self.ack_latencies = []
+        maze.observe(self.on_frame, 'current_call')
+
+    def on_frame(self, change):
+        sent_at = self.clock()
+        payload = json.loads(change['new'])
+        calls = payload if isinstance(payload, list) else [payload]
+        self.frames += 1
+        self.bytes += len(change['new'])
+        for i, call in enumerate(calls):
+            if not call.get('method_name') or call['method_name'] == 'halt':
+                self.queue = []
+                continue
+            start = max(sent_at + self.latency, self.busy_until)
+            self.busy_until = start + self.render_time
+            self.queue.append((self.busy_until, sent_at, call,
+                               i == len(calls) - 1))
+
+    def dispatch(self):
+        now = self.clock()
+        done = 0
+        while len(self.queue) > 0 and self.queue[0][0] <= now:
+            _, sent_at, call, ack = self.queue.pop(0)
+            self.calls += 1
+            if ack:
+                done += 1
+                self.ack_latencies.append(self.clock() - sent_at)
+                self.maze.method_return = json.dumps({
+                    'value': None,
+                    'cb': call['cb'],
+                    'ts': int(time.time() * 1000),
+                    'params': call['params'],
+                    'method': call['method_name'],
+                })
+        return done
+
+    def report(self):
+        latencies = [t * 1000 for t in self.ack_latencies]
+        return {
+            "frames": self.frames,
+            "calls": self.calls,
+            "bytes": self.bytes,
+            "bytes_per_call": round(self.bytes / self.calls, 1)
+            if self.calls else None,
+            "ack_p50_ms": round(percentile(latencies, 50) or 0, 3),
+            "ack_p90_ms": round(percentile(latencies, 90) or 0, 3),
+            "ack_p99_ms": round(percentile(latencies, 99) or 0, 3),
+        }
+
+
+@pytest.fixture
+def frontend(mock_comm, monkeypatch):
+    """Attaches a `FrontendStandIn` to a maze: ``frontend(maze, ...)``."""
+    def attach(maze, **kwargs):
+        from .. import flow_control
+        peer = FrontendStandIn(maze, **kwargs)
+        monkeypatch.setattr(flow_control, "dispatch_comm_msgs",
+                            peer.dispatch)
+        return peer
+    return attach
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Benchmarks of the simulation hot paths and of the frontend payloads.
+
+They run with the other tests at a small scale and only check that the
+results make sense; see `conftest.Benchmark` to run them longer and write
+the results as JSON. The protocol benchmarks run robot programs against
+`conftest.FrontendStandIn`, which executes and acks the calls like the view.
+"""
+
+import json
+import random
+import time
+
+import pytest
+
+from ..headless import HeadlessMaze
+from ..maze import Maze
+from ..models.world_model import WorldModel
+from ..models.world_parser import WorldParser
+from .conftest import TEST_WORLD
+
+ACTIONS = 2000
+SENSES = 5000
+# parses per world size
+PARSES = {"typical": 200, "large": 2, "sparse": 1}
+
+DIRECTIONS = ["east", "north", "west", "south"]
+
+
+def large_world(rows, cols, features, seed=0):
+    """A level config with `features` walls, objects, tiles and messages,
+    the same for a given seed."""
+    rng = random.Random(seed)
+
+    def cell():
+        return "{},{}".format(rng.randint(1, cols), rng.randint(1, rows))
+
+    walls = {}
+    for _ in range(features):
+        walls.setdefault(cell(), []).append(rng.choice(DIRECTIONS))
+    return {
+        "rows": rows,
+        "cols": cols,
+        "walls": walls,
+        "robots": [{"x": 1, "y": 1}],
+        "objects": {cell(): {"apple": rng.randint(1, 5)}
+                    for _ in range(features // 4)},
+        "tiles": {cell(): ["grass"] for _ in range(features // 4)},
+        "messages": {cell(): "hello" for _ in range(features // 20)},
+        "flags": [[rng.randint(1, cols), rng.randint(1, rows)]
+                  for _ in range(features // 20)],
+        "goal": {"position": {"x": cols, "y": rows}},
+    }
+
+
+WORLDS = {
+    "typical": TEST_WORLD,
+    "large": large_world(100, 100, 2000),
+    "sparse": large_world(1000, 1000, 5000),
+}
+
+
+def open_world(instructions=10 ** 9):
+    # an empty 100x100 world, moves never hit a wall before the border
+    world = WorldModel(None, None, {"MAX_INSTRUCTION_COUNT": instructions})
+    world.set_dimensions(100, 100)
+    world.add_tile_map()
+    world.add_robot(1, 1, 0, "red")
+    world.add_object(1, 1, "apple", 1)
+    return world
+
+
+def test_robot_actions(bench):
+    bot = HeadlessMaze(open_world()).bot()
+
+    def back_and_forth():
+        # one op is six actions
+        bot.move()
+        bot.turn_left()
+        bot.turn_left()
+        bot.move()
+        bot.turn_left()
+        bot.turn_left()
+
+    bench.run("robot.move_turn_left", back_and_forth, ACTIONS / 6)
+    bench.run("robot.turn_left", bot.turn_left, ACTIONS)
+
+    def take_put():
+        # one op is two actions
+        bot.take()
+        bot.put()
+
+    bench.run("robot.take_put", take_put, ACTIONS / 2)
+    assert (bot.x, bot.y) == (1, 1)
+
+
+def test_sensors(bench):
+    bot = HeadlessMaze(WorldModel(None, lambda world: WorldParser.parse(
+        world, TEST_WORLD))).bot()
+    for name in ("front_is_clear", "right_is_clear", "on_object",
+                 "message_here", "distance_ahead"):
+        result = bench.run("sensor." + name, getattr(bot, name), SENSES)
+        assert result["ops_per_sec"] > 0
+
+
+@pytest.mark.parametrize("size", sorted(WORLDS))
+def test_parse_and_build(bench, size, tmp_path):
+    config = WORLDS[size]
+    bench.run("parse." + size,
+              lambda: WorldParser.parse(WorldModel(), config), PARSES[size])
+
+    path = str(tmp_path / "level.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    bench.run("build." + size, lambda: WorldModel(path), PARSES[size])
+
+    template = WorldParser.compile(config)
+    bench.run("instantiate." + size, template.instantiate, 200)
+
+
+@pytest.mark.parametrize("size", sorted(WORLDS))
+def test_render_payload(bench, size):
+    world = WorldModel(None, lambda w: WorldParser.parse(w, WORLDS[size]))
+    calls = []
+    bench.run("render_all." + size,
+              lambda: world.render_all(lambda *call: calls.append(call)),
+              PARSES[size] * 5)
+    payload = json.dumps(calls[-1][1], separators=(',', ':'))
+    bench.record("render_all_bytes." + size, bytes=len(payload))
+    assert 0 < len(payload) < 1024 * 1024
+
+
+def test_widget_actions(bench, mock_comm):
+    maze = Maze(open_world())
+    bot = maze.bot()
+
+    bench.run("widget.turn_left", bot.turn_left, ACTIONS / 4)
+    frame = len(maze.current_call)
+    maze.redraw_all()
+    bench.record("widget.bytes_per_action", turn_left=frame,
+                 draw_all=len(maze.current_call))
+
+    batched = Maze(open_world(), batch=True, batch_size=50)
+    bench.run("widget.turn_left_batched", batched.bot().turn_left,
+              ACTIONS / 4)
+    assert frame > 0
+
+
+def turns(bot, n):
+    for _ in range(n):
+        bot.turn_left()
+    return n
+
+
+def walk(bot, n):
+    # east and back, one move or turn per action
+    for i in range(n):
+        if i % 10 == 9:
+            bot.turn_left()
+            bot.turn_left()
+        else:
+            bot.move()
+    return n + n // 10
+
+
+def take_put(bot, n):
+    for _ in range(n // 2):
+        bot.take()
+        bot.put()
+    return n // 2 * 2
+
+
+PROGRAMS = {"turns": turns, "walk": walk, "take_put": take_put}
+MODES = {
+    "unbatched": {},
+    "batched": {"batch": True, "batch_size": 50, "batch_interval": 60},
+}
+# seconds before a frame is run and per call, of the stand-in view
+FRONTENDS = {"instant": (0.0, 0.0), "slow": (0.002, 0.0002)}
+
+
+@pytest.mark.parametrize("frontend_name", sorted(FRONTENDS))
+@pytest.mark.parametrize("mode", sorted(MODES))
+@pytest.mark.parametrize("program", sorted(PROGRAMS))
+def test_protocol_round_trip(bench, frontend, program, mode, frontend_name):
+    maze = Maze(open_world(), **MODES[mode])
+    latency, render_time = FRONTENDS[frontend_name]
+    view = frontend(maze, latency=latency, render_time=render_time)
+
+    started = time.perf_counter()
+    actions = PROGRAMS[program](maze.bot(), int(ACTIONS / 10 * bench.scale))
+    assert maze.wait_ack(maze.last_cb, timeout=5)
+    elapsed = time.perf_counter() - started
+
+    report = view.report()
+    bench.record("protocol.{}.{}.{}".format(program, mode, frontend_name),
+                 actions=actions, seconds=round(elapsed, 6),
+                 calls_per_sec=round(report["calls"] / elapsed),
+                 bytes_per_action=round(report["bytes"] / actions, 1),
+                 **report)
+    # every call was run and the last one acked everything
+    assert report["calls"] == int(maze.last_cb)
+    assert maze.acked == int(maze.last_cb)
+    assert len(maze.flow.in_flight) == 0
+    if mode == "batched":
+        assert report["frames"] < report["calls"]
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+import json
+import threading
+
+import pytest
+
+from .. import grader
+from ..grader import (build_world, grade, grade_submission, level_optimum,
+                      main)
+from ..solver import optimal_instructions
+from ..variants import build_variant, choice_arities, sweep, variants
+
+SUBMISSIONS = {
+    "a_solved.py": "bot.move(2)\nbot.take()\nbot.take()\nbot.move(2)\n",
+    "b_unfinished.py": "bot.move(4)\n",
+    "c_crash.py": "bot.turn_left()\nbot.turn_left()\nbot.move()\n",
+    "d_spin.py": "while True:\n    bot.turn_left()\n",
+    "e_hang.py": "while bot.front_is_clear():\n    pass\n",
+    "f_sense.py": "while True:\n    bot.object_here()\n",
+}
+
+
+@pytest.fixture
+def submissions(tmp_path):
+    folder = tmp_path / "submissions"
+    folder.mkdir()
+    for name, source in SUBMISSIONS.items():
+        (folder / name).write_text(source)
+    return str(folder)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_grade(world_path, submissions, processes):
+    results = grade(world_path, submissions, processes=processes,
+                    timeout=0.5, max_instructions=500)
+    assert [r["passed"] for r in results] == [True] + [False] * 5
+
+    solved, unfinished, crash, spin, hang, sense = results
+    assert solved["instructions"] == 8
+    assert (solved["optimal"], solved["efficiency"]) == (8, 1.0)
+    assert unfinished["efficiency"] is None
+    assert solved["goals"] == [
+        {"goal": "Expected: Final Position: 5,1", "completed": True},
+        {"goal": "Expected: Pick object apple at: 3,1", "completed": True}]
+    assert unfinished["error"] is None
+    assert unfinished["goals"][0]["completed"]
+    assert crash["error"] == "RuntimeError: Opps You Hit the walls"
+    assert spin["error"] == "RuntimeError: Instruction Quota Exceeded"
+    assert sense["error"] == "RuntimeError: Instruction Limit Exceeded"
+    assert sense["instructions"] == 501
+    assert hang["error"].startswith("Timeout")
+
+
+def test_grade_off_main_thread(world_path, tmp_path):
+    # no SIGALRM outside the main thread, a deadline is traced instead
+    program = tmp_path / "busy.py"
+    program.write_text("while True:\n    pass\n")
+    results = []
+    worker = threading.Thread(target=lambda: results.extend(
+        grade(world_path, [str(program)], processes=1, timeout=0.2)))
+    worker.start()
+    worker.join(10)
+    assert not worker.is_alive()
+    assert results[0]["error"] == "Timeout: exceeded 0.2s"
+    assert results[0]["optimal"] is not None
+
+
+def test_grade_cli(world_path, submissions, tmp_path):
+    output = str(tmp_path / "report.json")
+    main([world_path, submissions, "-j", "1", "--timeout", "0.5",
+          "--profile", "-o", output])
+    with open(output) as f:
+        report = json.load(f)
+    assert report["summary"] == {"submissions": 6, "passed": 1, "failed": 5}
+    profile = report["results"][0]["profile"]
+    assert profile["calls"]["move"]["count"] == 2
+    assert profile["hot_cells"][0] == [1, 1, 1]
+
+
+RANDOM_WORLD = {
+    "rows": 3,
+    "cols": 4,
+    "robots": [{"x": 1, "y": 1,
+                "possible_initial_positions": [[1, 1], [1, 2], [1, 3]]}],
+    "objects": {"3,1": {"apple": "1-2"}},
+    "goal": {"possible_final_positions": [[4, 1], [4, 2]]}
+}
+
+
+def test_variants_exhaustive():
+    found = variants(RANDOM_WORLD)
+    assert choice_arities(RANDOM_WORLD) == [3, 2, 2]
+    assert len(found) == 12
+    assert len(set(tuple(v["choices"]) for v in found)) == 12
+
+
+def test_variants_stratified():
+    found = variants(RANDOM_WORLD, max_variants=6, seed=3)
+    assert len(found) == 6
+    for point, arity in enumerate([3, 2, 2]):
+        counts = [sum(1 for v in found if v["choices"][point] == option)
+                  for option in range(arity)]
+        assert counts == [6 // arity] * arity
+    assert found == variants(RANDOM_WORLD, max_variants=6, seed=3)
+
+
+def test_random_level_optimum(tmp_path, monkeypatch):
+    level = tmp_path / "random.json"
+    level.write_text(json.dumps(RANDOM_WORLD))
+    # every draw is scored against its own optimum, cached per draw
+    for _ in range(30):
+        world = build_world(str(level))
+        assert level_optimum(str(level), world) == \
+            optimal_instructions(world)
+
+    def blow_up(world):
+        raise RecursionError("too deep")
+
+    monkeypatch.setattr(grader, "optimal_instructions", blow_up)
+    monkeypatch.setattr(grader, "_optimal", {})
+    program = tmp_path / "solution.py"
+    program.write_text("bot.move(3)\n")
+    result = grade_submission({"level": str(level), "program": str(program),
+                               "timeout": 1, "max_instructions": 100})
+    assert result["optimal"] is None and result["efficiency"] is None
+    assert result["optimal_error"] == "RecursionError: too deep"
+    assert result["instructions"] == 3
+
+
+def test_sweep(tmp_path):
+    level = tmp_path / "random.json"
+    level.write_text(json.dumps(RANDOM_WORLD))
+    program = tmp_path / "solution.py"
+    program.write_text("bot.move(3)\n")
+
+    report = sweep(str(level), str(program), processes=2)
+    assert report["exhaustive"]
+    assert report["tested"] == 12
+    # the robot only gets home when it starts on the row of the goal
+    assert len(report["failed"]) == 8
+    passed = [r for r in report["results"] if r["passed"]]
+    assert [r["start"] for r in passed] == \
+        [[[1, 1, 0]]] * 2 + [[[1, 2, 0]]] * 2
+
+    world = build_variant(str(level), passed[0]["variant"])
+    assert [world.robots[0].x, world.robots[0].y] == [1, 1]
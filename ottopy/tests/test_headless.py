@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+import time
+
+import pytest
+
+from ..headless import HeadlessMaze, get_bot
+from ..models.world_model import WorldModel
+
+
+def test_headless_run(world_path):
+    bot = get_bot(world_path, record=True)
+    bot.move(2)
+    assert bot.on_object("apple")
+    bot.take()
+    bot.take()
+    bot.move(2)
+    assert bot.flag_count == 1
+    assert bot.world.check()
+    assert ["move_to", [0, 5, 1]] in bot.world.calls
+    assert ("success", "Expected: Final Position: 5,1") in bot.world.output
+
+
+def test_headless_errors(world_path):
+    bot = get_bot(world_path)
+    bot.turn_left()
+    bot.turn_left()
+    with pytest.raises(RuntimeError):
+        bot.move()
+    assert bot.world.output[-1] == ("error", "Opps You Hit the walls")
+
+
+def test_headless_quota(world_path):
+    maze = HeadlessMaze(WorldModel(world_path))
+    maze.model.set_quota(10)
+    bot = maze.bot()
+    with pytest.raises(RuntimeError, match="Quota"):
+        for _ in range(20):
+            bot.turn_left()
+
+
+def test_headless_speed(world_path):
+    bot = get_bot(world_path, options={'MAX_INSTRUCTION_COUNT': 10000})
+    start = time.perf_counter()
+    for _ in range(334):
+        bot.move()
+        bot.turn_left()
+        bot.turn_left()
+    assert bot.world_model.instruction_count == 1002
+    assert time.perf_counter() - start < 1
+
+
+def test_move_until_blocked(world_path):
+    bot = get_bot(world_path, record=True)
+    assert bot.distance_ahead() == 4
+    assert bot.move_until_blocked() == 4
+    assert (bot.x, bot.y, bot.flag_count, bot.move_count) == (5, 1, 1, 4)
+    assert bot.world.calls == [["remove_flag", [2, 1]], ["move_to", [0, 5, 1]]]
+
+    bot.turn_left()
+    assert bot.distance_ahead() == 4
+    bot.move()
+    bot.turn_left()
+    # the wall east of 4,2 stops the robot
+    assert bot.move_until_blocked() == 0
+    assert bot.world.model.instruction_count == 8
+
+    with pytest.raises(RuntimeError):
+        bot.move(2)
+    assert (bot.x, bot.y) == (5, 2)
+
+
+def test_distance_follows_walls():
+    world = WorldModel()
+    world.set_dimensions(6, 8)
+    world.add_wall(3, 2, "east")
+    world.add_wall(6, 2, "west")
+    world.add_wall(2, 4, "north")
+    world.add_flag(7, 2)
+    world.add_flag(8, 2)
+    for x in range(1, 9):
+        for y in range(1, 7):
+            for d, (dx, dy) in enumerate([(1, 0), (0, 1), (-1, 0), (0, -1)]):
+                steps, cx, cy = 0, x, y
+                while world.is_clear(cx, cy, d):
+                    steps, cx, cy = steps + 1, cx + dx, cy + dy
+                assert world.distance(x, y, d) == steps
+
+    assert world.distance(1, 2, "east") == 2
+    assert world.flags_on_path(5, 2, 0, 3) == [(7, 2), (8, 2)]
+    world.remove_wall(3, 2, "east")
+    assert world.distance(1, 2, "east") == 4
+
+
+def test_profiler(world_path):
+    bot = get_bot(world_path, options={"profile": True})
+    while bot.front_is_clear():
+        bot.move()
+        if bot.on_object("apple"):
+            bot.take()
+            bot.take()
+    bot.wall_in_front()
+
+    profile = bot.stats.profile()
+    assert profile["calls"]["move"]["count"] == 4
+    assert profile["calls"]["take"]["count"] == 2
+    # front_is_clear called by wall_in_front is not counted
+    assert profile["calls"]["front_is_clear"]["count"] == 5
+    assert profile["calls"]["wall_in_front"]["count"] == 1
+    assert (profile["sensor_calls"], profile["actuator_calls"]) == (10, 6)
+    assert profile["visits"] == {"1,1": 1, "2,1": 1, "3,1": 1, "4,1": 1,
+                                 "5,1": 1}
+    assert profile["instructions"] == bot.world_model.instruction_count
+
+    plain = get_bot(world_path)
+    assert plain.stats.profile() is None
+    assert "move" not in plain.__dict__
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+import json
+import subprocess
+import sys
+
+# seconds for a fresh interpreter to import the simulation api; well above
+# the ~10ms measured with compiled bytecode, to stay stable on slow runners
+IMPORT_BUDGET = 0.25
+
+JUPYTER_MODULES = ("ipywidgets", "traitlets", "IPython", "ipykernel")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+sys.stderr.write(json.dumps({{
+    "elapsed": elapsed,
+    "loaded": [m for m in {modules!r} if m in sys.modules],
+}}))
+"""
+
+
+def probe(module):
+    # a new interpreter, so nothing is imported already
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module,
+                                            modules=JUPYTER_MODULES)],
+        capture_output=True, text=True, check=True)
+    return proc.stdout, json.loads(proc.stderr)
+
+
+def test_sim_import_is_light():
+    probe("ottopy.sim")  # warm the bytecode cache
+    stdout, result = probe("ottopy.sim")
+    assert stdout == ""
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_BUDGET
+
+
+def test_package_import_is_lazy():
+    stdout, result = probe("ottopy")
+    assert stdout == "" and result["loaded"] == []
+
+    import ottopy
+    from ottopy.maze import Maze
+    assert ottopy.Maze is Maze
+    assert "get_robo_builder" in dir(ottopy)
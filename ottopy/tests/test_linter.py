@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+import copy
+import json
+
+from ..linter import lint, main
+from .conftest import TEST_WORLD
+
+
+def write_levels(folder):
+    levels = {"a_good": TEST_WORLD}
+
+    outside = copy.deepcopy(TEST_WORLD)
+    outside["rows"] = "4-6"
+    outside["goal"]["position"] = {"x": 5, "y": 5}
+    levels["b_outside"] = outside
+
+    # the goal corner is walled off from the second initial position
+    walled = copy.deepcopy(TEST_WORLD)
+    walled["robots"] = [{"x": 1, "y": 1,
+                         "possible_initial_positions": [[1, 1], [1, 5]]}]
+    walled["walls"] = {"1,4": ["north"], "1,5": ["east"]}
+    levels["c_walled"] = walled
+
+    greedy = copy.deepcopy(TEST_WORLD)
+    greedy["goal"]["objects"] = {"3,1": {"apple": 3}, "2,2": {"pear": 1}}
+    levels["d_greedy"] = greedy
+
+    for name, config in levels.items():
+        (folder / "{}.json".format(name)).write_text(json.dumps(config))
+    (folder / "e_broken.json").write_text("{")
+
+
+def test_lint(tmp_path):
+    write_levels(tmp_path)
+    report = lint(str(tmp_path), processes=2)
+    assert (report["levels"], report["failed"]) == (5, 4)
+
+    good, outside, walled, greedy, broken = report["results"]
+    assert good == {"level": str(tmp_path / "a_good.json"), "ok": True,
+                    "issues": []}
+    assert [i["message"] for i in outside["issues"]] == \
+        ["final position at 5,5 is outside the 5x4 world"]
+    assert [i["message"] for i in walled["issues"]] == [
+        "final position at 5,1 can not be reached by robot 0 from 1,5",
+        "pick goal at 3,1 can not be reached by robot 0 from 1,5"]
+    assert [i["kind"] for i in greedy["issues"]] == ["contradiction"] * 2
+    assert broken["issues"][0]["kind"] == "parse"
+
+
+def test_lint_cli(tmp_path, capsys):
+    (tmp_path / "level.json").write_text(json.dumps(TEST_WORLD))
+    assert main([str(tmp_path), "-j", "1"]) == 0
+    assert json.loads(capsys.readouterr().out)["failed"] == 0
@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from .. import _kernel, flow_control
+from .. import maze as maze_module
+from ..async_robot import AsyncRobot
+from ..events import Event, EventMetrics
+from ..flow_control import CreditWindow
+from ..lib import get_robo_builder
+from ..maze import Maze
+from ..replay import ReplayWriter
+from ..models.grid import pos_key
+from ..models.world_model import WorldModel
+from .conftest import TEST_WORLD
+
+
+def test_unbatched_calls(mock_comm, world_path):
+    maze = Maze(WorldModel(world_path))
+    maze.bot().turn_left()
+    call = json.loads(maze.current_call)
+    assert call["method_name"] == "turn_left"
+    assert call["params"] == [0]
+
+
+def test_batched_calls(mock_comm, world_path):
+    maze = Maze(WorldModel(world_path), batch=True, batch_size=3,
+                batch_interval=60)
+    bot = maze.bot()
+    bot.turn_left()
+    bot.turn_left()
+    assert maze.current_call == '{}'
+
+    bot.turn_left()
+    calls = json.loads(maze.current_call)
+    assert [c["method_name"] for c in calls] == ["turn_left"] * 3
+
+    bot.turn_left()
+    bot.move()
+    maze.flush()
+    calls = json.loads(maze.current_call)
+    assert [c["method_name"] for c in calls] == \
+        ["turn_left", "remove_flag", "move_to"]
+    assert maze.batch_q == []
+
+
+def test_method_return_acks(mock_comm, world_path, monkeypatch):
+    monkeypatch.setattr(flow_control, "dispatch_comm_msgs", lambda: 0)
+    maze = Maze(WorldModel(world_path))
+    bot = maze.bot()
+    bot.turn_left()
+    bot.turn_left()
+    assert list(maze.flow.in_flight) == ["1", "2"]
+
+    maze.method_return = json.dumps({"cb": "1", "value": None})
+    assert list(maze.flow.in_flight) == ["2"]
+    assert maze.flow.window == 5
+
+
+def test_credit_window_adapts():
+    flow = CreditWindow(window=4, target_latency=0.5)
+    flow.sent("1")
+    flow.ack("1")
+    assert flow.window == 5
+
+    flow.sent("2")
+    flow.sent("3")
+    flow.in_flight["3"] -= 10
+    flow.ack("3")
+    assert len(flow.in_flight) == 0
+    assert flow.window == 2
+
+
+def test_credit_window_receives_when_exhausted(monkeypatch):
+    scans = []
+    monkeypatch.setattr(flow_control, "dispatch_comm_msgs",
+                        lambda: scans.append(1) or 0)
+    flow = CreditWindow(window=2, ack_timeout=0, poll_interval=0)
+    flow.sent("1")
+    flow.acquire()
+    assert scans == []
+    flow.sent("2")
+    flow.acquire()
+    # the oldest frame is given up on after `ack_timeout`
+    assert len(scans) >= 1 and list(flow.in_flight) == ["2"]
+
+
+def test_credit_window_fallback_pacing(monkeypatch):
+    monkeypatch.setattr(flow_control, "get_kernel", lambda: object())
+    flow = CreditWindow(window=1, fallback_every=2, fallback_sleep=0)
+    flow.sent("1")
+    flow.acquire()
+    flow.acquire()
+    assert flow.can_receive is False
+    assert flow.paced == 2
+
+
+def test_replay_writer(tmp_path):
+    writer = ReplayWriter(str(tmp_path / "run.html"))
+    writer.start("<body>")
+    writer.write({"method_name": "move_to", "params": [0, 2, 1]})
+    writer.write({"method_name": "turn_left", "params": [0]})
+    writer.flush()
+    writer.write({"method_name": "halt", "params": []})
+    writer.close()
+
+    text = (tmp_path / "run.html").read_text()
+    assert text == (
+        '<body><script>steps = steps.concat(['
+        '{"method_name":"move_to","params":[0,2,1]},'
+        '{"method_name":"turn_left","params":[0]}])</script>\n'
+        '<script>steps = steps.concat(['
+        '{"method_name":"halt","params":[]}])</script>\n')
+
+
+def test_gen_html_flushes_on_check(mock_comm, world_path, tmp_path,
+                                   monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    maze = Maze(WorldModel(world_path), gen_html=True)
+    maze.bot().turn_left()
+    maze.check()
+
+    text = (tmp_path / "last_run.html").read_text()
+    assert text.count("<script>") == 1
+    assert '"method_name":"turn_left"' in text
+    maze.replay.close()
+
+
+def test_gen_html_flushes_on_error(mock_comm, world_path, tmp_path,
+                                   monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    maze = Maze(WorldModel(world_path, None, {"MAX_INSTRUCTION_COUNT": 2}),
+                gen_html=True)
+    bot = maze.bot()
+    with pytest.raises(RuntimeError):
+        for _ in range(5):
+            bot.turn_left()
+    text = (tmp_path / "last_run.html").read_text()
+    assert text.endswith("])</script>\n")
+    assert '"method_name":"halt"' in text
+
+    # and at the end of a cell that raised in the program itself
+    shell = fake_shell(monkeypatch)
+    bot = Maze(WorldModel(world_path), gen_html=True).bot()
+    bot.turn_left()
+    shell.run_cell()
+    assert (tmp_path / "last_run.html").read_text().endswith("])</script>\n")
+    maze.replay.close()
+
+
+class FakeShell():
+    def __init__(self):
+        self.events = self
+        self.hooks = []
+
+    def register(self, event, hook):
+        self.hooks.append((event, hook))
+
+    def run_cell(self):
+        for _, hook in self.hooks:
+            hook(None)
+
+
+def fake_shell(monkeypatch):
+    shell = FakeShell()
+    monkeypatch.setattr(maze_module, "get_ipython", lambda: shell)
+    monkeypatch.setattr(maze_module, "_hooked_shell", None)
+    return shell
+
+
+def test_cell_end_hook(mock_comm, world_path, monkeypatch):
+    shell = fake_shell(monkeypatch)
+    mazes = [Maze(WorldModel(world_path), batch=True, batch_interval=60)
+             for _ in range(3)]
+    for maze in mazes:
+        maze.bot().turn_left()
+    # one hook for every maze, holding no maze once it has flushed them
+    assert len(shell.hooks) == 1
+    shell.run_cell()
+    assert all(maze.batch_q == [] for maze in mazes)
+    assert len(maze_module._unflushed) == 0
+
+    mazes[0].bot().turn_left()
+    assert list(maze_module._unflushed) == [mazes[0]]
+    shell.run_cell()
+    assert json.loads(mazes[0].current_call)[0]["method_name"] == "turn_left"
+    assert len(shell.hooks) == 1
+
+
+def test_chunk_requests(mock_comm, world_path, monkeypatch):
+    maze = Maze(WorldModel(world_path))
+    sent = []
+    monkeypatch.setattr(maze, "send", sent.append)
+    maze._handle_custom_msg({"event": "request_chunks",
+                             "chunks": [[3, 1, 2, 2]]}, [])
+    content = sent[-1]
+    assert content["event"] == "draw_chunks"
+    assert content["chunks"][0]["objects"] == {"3,1": {"apple": 2}}
+    assert content["chunks"][0]["hwalls"] == {"3,1": 1}
+
+
+def test_ready_handshake(mock_comm, world_path, monkeypatch):
+    maze = Maze(WorldModel(world_path))
+    pumped = []
+
+    def dispatch():
+        # the view renders on the second dispatch, then acks what it drew
+        pumped.append(1)
+        if len(pumped) == 2:
+            maze.is_inited = True
+        if maze.last_cb is not None:
+            maze.method_return = json.dumps({"cb": maze.last_cb})
+        return 1
+
+    monkeypatch.setattr(flow_control, "dispatch_comm_msgs", dispatch)
+    assert maze.wait_ready(timeout=1)
+    assert len(pumped) == 2
+
+    assert maze.redraw_all(timeout=1)
+    assert json.loads(maze.current_call)["method_name"] == "draw_all"
+    assert maze.ack_waiters == {}
+
+
+def test_ready_timeout(mock_comm, world_path, monkeypatch):
+    maze = Maze(WorldModel(world_path))
+    monkeypatch.setattr(flow_control, "dispatch_comm_msgs", lambda: 0)
+    assert not maze.wait_ready(timeout=0.05)
+    # without a kernel to dispatch from, it gives up right away
+    monkeypatch.setattr(flow_control, "dispatch_comm_msgs", lambda: None)
+    assert not maze.wait_ack(1, timeout=5)
+
+
+def test_ready_message(mock_comm, world_path, monkeypatch):
+    # without the opt-in, the shell queue of the kernel is left alone
+    assert _kernel.dispatch_comm_msgs() is None
+    monkeypatch.setattr(_kernel, "SUPPORTED_IPYKERNEL", ())
+    assert not _kernel.enable_comm_dispatch()
+    maze = Maze(WorldModel(world_path))
+    started = time.monotonic()
+    assert not maze.wait_ready(timeout=5)
+    assert time.monotonic() - started < 1
+
+    # calls made before the view rendered are drawn again once it is ready
+    maze.bot().turn_left()
+    maze.bot().turn_left()
+    maze._handle_custom_msg({"event": "ready", "cb": maze.last_cb}, [])
+    assert maze.ready.done()
+    assert json.loads(maze.current_call)["method_name"] == "draw_all"
+
+
+def test_ready_after_run(mock_comm, world_path):
+    maze = Maze(WorldModel(world_path))
+    maze.model.set_quota(3)
+    maze.bot().turn_left()
+    maze.bot().turn_left()
+    with pytest.raises(RuntimeError):
+        maze.bot().turn_left()
+    final = maze.current_call
+
+    # a view that saw the first call keeps its trace and messages
+    maze._handle_custom_msg({"event": "ready", "cb": "1"}, [])
+    maze._handle_custom_msg({"event": "ready", "cb": None}, [])
+    assert maze.ready.done()
+    assert maze.current_call == final
+
+    # a view that missed it is drawn again, past the exhausted quota
+    maze._handle_custom_msg({"event": "ready", "cb": maze.last_cb}, [])
+    assert json.loads(maze.current_call)["method_name"] == "draw_all"
+
+
+def test_async_robot(mock_comm, world_path, monkeypatch):
+    maze = Maze(WorldModel(world_path))
+    acks = []
+
+    def dispatch():
+        # the view acks whatever was sent last
+        if maze.last_cb is not None and maze.acked < int(maze.last_cb):
+            acks.append(maze.last_cb)
+            maze.method_return = json.dumps({"cb": maze.last_cb})
+        return 1
+
+    monkeypatch.setattr(flow_control, "dispatch_comm_msgs", dispatch)
+    bot = AsyncRobot(maze.bot(), timeout=1)
+
+    async def run():
+        assert await bot.move_until_blocked() == 4
+        await bot.turn_left()
+        return bot.front_is_clear()
+
+    assert asyncio.run(run())
+    assert (bot.x, bot.y, bot.dir) == (5, 1, 1)
+    # an ack releases the calls sent before it too
+    assert acks == ["2", "3"] and maze.ack_waiters == {}
+
+
+def test_async_robot_awaits_credits(mock_comm, world_path, monkeypatch):
+    monkeypatch.setattr(flow_control, "dispatch_comm_msgs", lambda: 0)
+    maze = Maze(WorldModel(world_path))
+    maze.flow.window = 1
+    maze.flow.ack_timeout = 0.05
+    maze.flow.sent("0")
+    ticks = []
+    sent_after = []
+    maze.observe(lambda change: sent_after.append(len(ticks)), "current_call")
+    bot = AsyncRobot(maze.bot(), timeout=0.05)
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.005)
+
+    async def run():
+        task = asyncio.ensure_future(ticker())
+        await bot.turn_left()
+        task.cancel()
+
+    asyncio.run(run())
+    # the event loop kept running while the window was exhausted
+    assert sent_after[0] > 1
+    assert maze.flow.blocking
+
+
+def test_async_robot_without_dispatch(mock_comm, world_path, monkeypatch):
+    # dispatch is off by default, no ack can arrive during the cell
+    monkeypatch.setattr(flow_control, "get_kernel", lambda: object())
+    maze = Maze(WorldModel(world_path))
+    maze.flow.fallback_every = 2
+    maze.flow.fallback_sleep = 0.01
+    bot = AsyncRobot(maze.bot())
+
+    async def run():
+        for _ in range(20):
+            await bot.turn_left()
+        return await bot.sync()
+
+    started = time.monotonic()
+    assert not asyncio.run(run())
+    # paced, not waiting the ack timeout of every action
+    assert time.monotonic() - started < 1
+    assert maze.flow.can_receive is False and maze.flow.paced == 20
+    assert maze.ack_waiters == {}
+
+
+def test_async_robot_cancel(mock_comm, world_path, monkeypatch):
+    monkeypatch.setattr(flow_control, "dispatch_comm_msgs", lambda: 0)
+    maze = Maze(WorldModel(world_path))
+    bot = AsyncRobot(maze.bot(), timeout=60)
+
+    async def run():
+        task = asyncio.ensure_future(bot.turn_left())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert json.loads(maze.current_call)["method_name"] == "halt"
+    assert maze.ack_waiters == {} and len(maze.flow.in_flight) == 0
+
+
+def test_event_bus(mock_comm, world_path, monkeypatch):
+    encodings = []
+    encode = Event.encode
+
+    def counting_encode(event):
+        if event.text is None:
+            encodings.append(event.method_name)
+        return encode(event)
+
+    monkeypatch.setattr(Event, "encode", counting_encode)
+    maze = Maze(WorldModel(world_path))
+    events = []
+    maze.events.subscribe(events.append)
+    metrics = maze.events.subscribe(EventMetrics())
+
+    bot = maze.bot()
+    bot.move()
+    bot.move()
+    # widget and metrics sinks share one encoding per event
+    assert encodings == ["remove_flag", "move_to", "move_to"]
+    assert maze.current_call is events[-1].text
+    report = metrics.report()
+    assert report["events"] == 3
+    assert report["methods"]["move_to"]["bytes"] == \
+        sum(len(e.text) for e in events if e.method_name == "move_to")
+
+
+def test_robo_builder(mock_comm, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "worlds").mkdir()
+    (tmp_path / "worlds" / "level1.json").write_text(json.dumps(TEST_WORLD))
+    placed = []
+    wait_for_bot = get_robo_builder(
+        levels={"level1": lambda world: world.add_object(2, 2, "apple", 1)},
+        robo_fn={"level1": lambda bot: placed.append((bot.x, bot.y))})
+
+    bot = wait_for_bot("level1", wait=0)
+    assert placed == [(1, 1)]
+    assert bot.world.model.ui_id == "ttgt_world_1"
+    assert bot.world.model.objects[pos_key(2, 2)] == {"apple": 1}
+    bot.move()
+    assert (bot.x, bot.y) == (2, 1)
+    assert json.loads(bot.world.current_call)["method_name"] == "move_to"
+    assert wait_for_bot("level1", wait=0).world.model.ui_id == "ttgt_world_2"
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+import json
+
+import pytest
+
+from ..headless import HeadlessMaze
+from ..maze import Maze
+from ..models.grid import pos_key
+from ..models.world_model import WorldModel
+from ..scheduler import Scheduler
+
+
+def row_world(robots, cols=10):
+    # robots on the first row, all facing east
+    world = WorldModel(None, lambda w: None, {"MAX_INSTRUCTION_COUNT": 10000})
+    world.set_dimensions(60, cols)
+    for y in range(1, robots + 1):
+        world.add_robot(1, y, 0, "red")
+    return world
+
+
+async def to_the_wall(bot):
+    while bot.front_is_clear():
+        await bot.move()
+
+
+def test_lockstep_rounds():
+    maze = HeadlessMaze(row_world(60), record=True)
+    result = Scheduler(maze).run(to_the_wall)
+    assert result == {"rounds": 10, "finished": list(range(60)),
+                      "errors": {}, "unfinished": []}
+    assert all(bot.x == 10 for bot in maze.robots)
+    assert len(maze.calls) == 9 * 60
+
+
+def test_collisions():
+    world = WorldModel()
+    world.set_dimensions(1, 5)
+    world.add_robot(1, 1, 0, "red")
+    world.add_robot(3, 1, 0, "blue")
+    maze = HeadlessMaze(world)
+    scheduler = Scheduler(maze, max_rounds=3)
+
+    async def wait(bot):
+        await bot.turn_left()
+        await bot.turn_left()
+
+    async def bump(bot):
+        await bot.move(2)
+
+    result = scheduler.run([bump, wait])
+    assert result["errors"] == {0: "RuntimeError: Another robot is in the way"}
+    assert (maze.robots[0].x, maze.robots[0].y) == (1, 1)
+
+    follow = Scheduler(maze)
+    assert follow.bot(0).move_until_blocked().value == 1
+    assert follow.occupied == {pos_key(2, 1): 0, pos_key(3, 1): 1}
+
+
+def test_controller_rounds(mock_comm):
+    maze = Maze(row_world(50))
+    frames = []
+    maze.observe(lambda change: frames.append(json.loads(change["new"])),
+                 "current_call")
+
+    def controller(bots, round):
+        for bot in bots:
+            bot.move()
+        return round < 2
+
+    assert Scheduler(maze).run_controller(controller) == 3
+    # one frame of 50 moves per round
+    assert [len(frame) for frame in frames] == [50, 50, 50]
+    assert not maze.batch
+
+
+def test_programs_only_await_actions():
+    maze = HeadlessMaze(row_world(1))
+
+    async def sleepy(bot):
+        await asyncio.sleep(0)
+
+    with pytest.raises(RuntimeError):
+        Scheduler(maze).run(sleepy)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+from ..headless import HeadlessMaze
+from ..models.world_model import WorldModel
+from ..solver import get_solver, optimal_instructions
+
+
+def test_paths(world_path):
+    world = WorldModel(world_path)
+    solver = get_solver(world)
+    assert solver.path((1, 1, 0), 3, 1) == ["move", "move"]
+    # one turn left beats three for going north, the wall north of 3,1
+    # makes going up column 3 a detour
+    assert solver.path((1, 1, 0), 1, 3) == ["turn_left", "move", "move"]
+    assert solver.cost((1, 1, 0), 3, 2) == 7
+    assert solver.cost((1, 1, 0), 1, 1, 3) == 3
+    assert len(solver.reachable(1, 1)) == 25
+
+    fields = solver.fields
+    world.add_wall(1, 1, "east")
+    assert solver.cost((1, 1, 0), 3, 1) == 12
+    assert solver.fields is not fields
+
+
+def test_replayed_path_arrives(world_path):
+    world = WorldModel(world_path)
+    bot = HeadlessMaze(world).bot()
+    for instruction in get_solver(world).path((1, 1, 0), 5, 3, "west"):
+        getattr(bot, instruction)()
+    assert (bot.x, bot.y, bot.dir) == (5, 3, 2)
+
+
+def test_optimal_instructions(world_path):
+    world = WorldModel(world_path)
+    # two moves, two takes of two instructions, two moves
+    assert optimal_instructions(world) == 8
+
+    world = WorldModel()
+    world.set_dimensions(3, 3)
+    world.add_robot(1, 1, 0, "red")
+    world.add_object(3, 1, "apple", 2)
+    world.add_drop_obj_goal(1, 3, "apple", 2)
+    world.add_home_goal(2, 2)
+    # to 3,1: 2, take twice: 4, to 1,3: 1 + 2 + 1 + 2, put twice: 2,
+    # to 2,2: 1 + 1 + 1 + 1
+    assert optimal_instructions(world) == 18
+
+    world.add_wall(1, 2, "north")
+    world.add_wall(2, 3, "west")
+    assert optimal_instructions(world) is None
+
+
+def test_locked_cells(world_path):
+    world = WorldModel()
+    world.set_dimensions(3, 3)
+    world.add_robot(1, 1, 0, "red")
+    world.add_object(2, 1, "apple", 1)
+    world.add_object(3, 1, "apple", 1)
+    world.add_drop_obj_goal(1, 3, "apple", 1)
+    # the apple next to the robot can not be picked, the far one is used
+    world.pick_allowed(2, 1)
+    assert get_solver(world).stops((1, 1, 0))[0].x == 3
+
+    world.drop_allowed(1, 3)
+    assert optimal_instructions(world) is None
+
+    world = WorldModel(world_path)
+    world.pick_allowed(3, 1)
+    assert optimal_instructions(world) is None
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+import json
+
+import pytest
+
+from ..headless import get_bot
+from ..trace import TraceReader, TraceRecorder, load_trace
+
+
+def run(bot):
+    bot.world.redraw_all()
+    bot.set_speed(0.2)
+    for _ in range(2):
+        bot.move()
+        bot.turn_left()
+        bot.turn_left()
+    bot.move(2)
+    bot.take()
+    bot.world.js_call("unknown_call", [{"a": 1}, True])
+
+
+def test_trace_round_trip(world_path, tmp_path):
+    recorder = TraceRecorder()
+    bot = get_bot(world_path, recorder=recorder)
+    run(bot)
+
+    expected = []
+    bot = get_bot(world_path, record=True)
+    run(bot)
+    for method_name, params in bot.world.calls:
+        expected.append(json.loads(json.dumps([method_name, params])))
+
+    path = str(tmp_path / "run.ottr")
+    recorder.save(path)
+    events = list(load_trace(path))
+    # draw_all is recorded before take() changes the objects it refers to
+    assert events[0]["params"][7] == {"3,1": {"apple": 2}}
+    assert [[e["method_name"], e["params"]] for e in events][1:] == \
+        expected[1:]
+    assert events[-2]["stats"] == {"max_capacity": None, "current_load": 1,
+                                   "total_moves": 4, "basket": ["apple"]}
+    assert events[0]["ui_id"] == "ttgt_world_1"
+
+
+def test_trace_is_compact(world_path):
+    recorder = TraceRecorder()
+    bot = get_bot(world_path, recorder=recorder,
+                  options={'MAX_INSTRUCTION_COUNT': 5000})
+    for _ in range(500):
+        bot.move()
+        bot.turn_left()
+        bot.turn_left()
+    raw = recorder.to_bytes(compress=False)
+    assert len(TraceReader(raw)) == len(recorder) == 1501
+
+    as_json = sum(len(json.dumps(e)) for e in TraceReader(raw).events())
+    assert len(raw) * 10 < as_json
+    assert len(recorder.to_bytes()) * 100 < as_json
+
+
+def test_trace_rejects_other_files():
+    with pytest.raises(ValueError):
+        TraceReader(b"not a trace")
+
+
+def test_trace_large_ints():
+    recorder = TraceRecorder()
+    recorder.record({"method_name": "turn_left", "params": [1 << 40]})
+    recorder.record({"method_name": "update_object", "params": [2, 3, 7]})
+    events = list(TraceReader(recorder.to_bytes()).events())
+    assert [e["params"] for e in events] == [[1 << 40], [2, 3, 7]]
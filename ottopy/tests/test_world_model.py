@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+import json
+import os
+
+import pytest
+
+from ..models.grid import key_pos, pos_key
+from ..models.levels import LevelCache
+from ..models.world_model import (BLOCKED_EAST, BLOCKED_NORTH, BLOCKED_SOUTH,
+                                  BLOCKED_WEST, Cell, Direction, WallType,
+                                  WorldModel)
+from ..models.world_parser import VariantRandom, WorldParser
+from .conftest import TEST_WORLD
+
+
+def test_wall_storage(world_path):
+    world = WorldModel(world_path)
+    assert world.hwalls[3][1] == WallType.NORMAL
+    assert world.vwalls[4][2] == WallType.NORMAL
+    assert len(world.vwalls) == 6 and len(world.vwalls[0]) == 6
+
+    vwalls = world.vwalls.tolist()
+    assert vwalls[4] == [0, 0, 1, 0, 0, 0]
+    assert sum(map(sum, vwalls)) == 1
+
+    world.vwalls[1][1] = WallType.NORMAL | WallType.REMOVABLE
+    assert world.cells[0][0].get_wall("east") == 3
+    assert world.cells[1][0].has_wall("west")
+    assert not world.is_clear(2, 1, 2)
+
+
+def test_cells_are_views(world_path):
+    world = WorldModel(world_path)
+    cell = world.cells[0][1]
+    assert (cell.x, cell.y, cell.msg) == (1, 2, "hello")
+
+    cell.editable["drop"] = False
+    assert world.cells[0][1].editable == {"pick": True, "drop": False}
+    world.pick_allowed(1, 2)
+    assert not Cell(1, 2, world).editable["pick"]
+
+    world.add_tile(2, 2, ["grass"])
+    assert world.cells[1][1].background == ["grass"]
+    assert world.tiles.tolist()[1] == [None, ["grass"], None, None, None]
+    with pytest.raises(IndexError):
+        world.cells[5][0]
+
+
+def test_grid_copy(world_path):
+    world = WorldModel(world_path)
+    walls = world.hwalls.copy()
+    world.hwalls[3][1] = 0
+    assert walls[3][1] == WallType.NORMAL
+    assert walls.buffer is not world.hwalls.buffer
+
+
+def test_blocked_masks(world_path):
+    world = WorldModel(world_path)
+    # borders of the corner cell, the wall north of 3,1, east of 4,2
+    assert world.blocked.get(0, 0) == BLOCKED_WEST | BLOCKED_SOUTH
+    assert world.blocked.get(2, 0) == BLOCKED_NORTH | BLOCKED_SOUTH
+    assert world.blocked.get(2, 1) == BLOCKED_SOUTH
+    assert world.blocked.get(4, 1) == BLOCKED_EAST | BLOCKED_WEST
+
+    world.cells[2][0].set_wall("north", WallType.GOAL)
+    assert world.is_clear(3, 1, 1) and world.is_clear(3, 2, "south")
+    world.vwalls[2][4] = WallType.NORMAL
+    assert not world.is_clear(2, 4, 0) and not world.is_clear(3, 4, 2)
+    assert world.cells[2][3].has_block(Direction.WEST)
+
+    for x in range(1, 6):
+        for y in range(1, 6):
+            for d in Direction:
+                assert world.is_clear(x, y, d) == \
+                    (not Cell(x, y, world).has_border(d) and
+                     not Cell(x, y, world).has_wall(d))
+
+
+def test_dense_world_is_not_capped():
+    from ..models import MAX_COLS, MAX_ROWS
+    world = WorldModel()
+    world.set_dimensions(40, 40)
+    assert not world.sparse and (world.rows, world.cols) == (40, 40)
+    # dense worlds are sent as nested lists, like before
+    world.add_wall(30, 30, "east")
+    world.tilemap = {}
+    calls = []
+    world.render_all(lambda name, params: calls.append(params))
+    vwalls = calls[0][4]
+    assert len(vwalls) == 41 and vwalls[30][30] == 1
+    assert isinstance(calls[0][9], list)
+    # deprecated, still importable
+    assert (MAX_ROWS, MAX_COLS) == (20, 20)
+
+
+def test_large_world_is_sparse():
+    world = WorldModel()
+    world.set_dimensions(2000, 2000)
+    assert world.sparse and (world.rows, world.cols) == (2000, 2000)
+    assert len(world.hwalls.buffer) == 0
+
+    world.add_wall(1000, 1000, "east")
+    world.add_tile(5, 7, "grass")
+    assert not world.is_clear(1000, 1000, 0)
+    assert not world.is_clear(1001, 1000, 2)
+    assert world.is_clear(1000, 1000, 1)
+    assert not world.is_clear(2000, 2000, 1) and not world.is_clear(1, 5, 2)
+    assert world.cells[1999][0].has_block("east")
+    assert world.cells[4][6].editable == {"pick": True, "drop": True}
+
+    world.tilemap = {}
+    calls = []
+    world.render_all(lambda name, params: calls.append(params))
+    vwalls, hwalls, tiles = calls[0][4], calls[0][5], calls[0][9]
+    # only the first viewport is sent, the wall is far from it
+    assert (vwalls, hwalls, tiles) == ({}, {}, {"5,7": "grass"})
+    assert world.render_chunk(993, 993, 16, 16)["vwalls"] == {"1000,1000": 1}
+
+    # cell keys pack 16 bits per coordinate
+    with pytest.raises(ValueError):
+        WorldModel().set_dimensions(10, 70000)
+
+    world.remove_wall(1000, 1000, "east")
+    assert world.is_clear(1001, 1000, "west")
+
+
+def test_chunked_render():
+    world = WorldModel()
+    world.set_dimensions(500, 500)
+    world.add_robot(100, 40, 0, "red")
+    world.add_wall(100, 40, "north")
+    world.add_wall(1, 300, "west")
+    world.add_object(101, 41, "apple", 1)
+    world.add_object(300, 300, "apple", 1)
+
+    assert world.first_viewport() == [81, 17, 32, 32]
+    assert world.first_viewport(0.5) == [65, 1, 64, 64]
+
+    world.tilemap = {}
+    calls = []
+    world.render_all(lambda name, params: calls.append(params))
+    properties, vwalls, hwalls, objects = (calls[0][i] for i in (0, 4, 5, 7))
+    assert properties["viewport"] == [81, 17, 32, 32]
+    assert properties["chunk_size"] == 16
+    assert (vwalls, hwalls, objects) == \
+        ({}, {"100,40": 1}, {"101,41": {"apple": 1}})
+
+    chunk = world.render_chunk(1, 289, 16, 16)
+    assert chunk["vwalls"] == {"0,300": 1}
+    assert world.render_chunk(289, 289, 16, 16)["objects"] == \
+        {"300,300": {"apple": 1}}
+    assert world.render_chunk(17, 289, 16, 16)["vwalls"] == {}
+
+
+def test_int_keyed_stores(world_path):
+    world = WorldModel(world_path)
+    assert world.objects == {pos_key(3, 1): {"apple": 2}}
+    assert world.flags == {pos_key(2, 1): 1}
+    assert Cell(1, 2, world).msg == "hello"
+    assert key_pos(pos_key(300, 2)) == (300, 2)
+
+    calls = []
+    world.render_all(lambda name, params: calls.append(params))
+    assert calls[0][7] == {"3,1": {"apple": 2}}
+    assert calls[0][10] == {"1,2": "hello"}
+    assert calls[0][11] == {"2,1": 1}
+
+
+def test_level_cache(world_path):
+    cache = LevelCache()
+    level = cache.get(world_path)
+    assert cache.get(world_path) is level
+    assert level.layout is not None
+
+    first = level.instantiate()
+    second = level.instantiate()
+    first.remove_wall(3, 1, "north")
+    first.remove_flag(2, 1)
+    assert second.hwalls[3][1] == WallType.NORMAL
+    assert not second.is_clear(3, 1, "north") and first.is_clear(3, 1, 1)
+    assert second.flags == {pos_key(2, 1): 1}
+    assert second.objects == {pos_key(3, 1): {"apple": 2}}
+    assert [g.msg() for g in second.goals] == \
+        [g.msg() for g in WorldModel(world_path).goals]
+
+    config = dict(TEST_WORLD, rows="5-6",
+                  robots=[{"possible_initial_positions": [[1, 1], [2, 2]]}])
+    with open(world_path, "w") as f:
+        json.dump(config, f)
+    os.utime(world_path, ns=(0, 1))
+    level = cache.get(world_path)
+    assert level.layout is None
+    world = level.instantiate(options={"rng": VariantRandom(0, [1, 1])})
+    assert world.rows == 6 and (world.robots[0].x, world.robots[0].y) == (2, 2)
+
+
+def test_world_template():
+    template = WorldParser.compile(TEST_WORLD)
+    first = template.instantiate(options={"MAX_INSTRUCTION_COUNT": 5})
+    second = template.instantiate()
+    assert first.hwalls.buffer is second.hwalls.buffer
+    assert first.max_instruction_count() == 5
+    assert first.goals == second.goals and first.goals is not second.goals
+
+    first.remove_wall(3, 1, "north")
+    first.add_wall(2, 2, "east")
+    first.remove_flag(2, 1)
+    del first.objects[pos_key(3, 1)]
+    first.robots[0].x = 4
+    first.tilemap["grass"] = "lava.png"
+    assert first.hwalls.buffer is not second.hwalls.buffer
+    assert first.is_clear(3, 1, 1) and not first.is_clear(2, 2, 0)
+    assert not second.is_clear(3, 1, 1) and second.is_clear(2, 2, 0)
+    assert second.distance(1, 2, 0) == 3 and first.distance(1, 2, 0) == 1
+
+    third = template.instantiate()
+    assert third.hwalls[3][1] == WallType.NORMAL and third.wall_version == 0
+    assert third.flags == {pos_key(2, 1): 1}
+    assert third.objects == {pos_key(3, 1): {"apple": 2}}
+    assert (third.robots[0].x, third.robots[0].y) == (1, 1)
+    assert third.tilemap["grass"] != "lava.png"
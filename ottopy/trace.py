@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Compact columnar traces of robot runs.
+
+A `TraceRecorder` receives exactly the calls a maze sends to its frontend and
+stores them column wise: one opcode byte per call, integer operands (robot
+index, packed ``x, y`` coordinates, counts, string references) in one int
+column, numbers in one float column and every string once in a string table.
+The stats attached to a call are stored in their own columns, only when they
+differ from the stats of the previous call. `load_trace` streams the calls
+back as the original dicts.
+
+File layout::
+
+    b"OTTR" | version (1 byte) | flags (1 byte, 1 = zlib) | body
+    body = header length (uint32) | header json | column bytes...
+"""
+
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+MAGIC = b"OTTR"
+VERSION = 1
+FLAG_COMPRESSED = 1
+HAS_STATS = 0x80
+SAME_STATS = 0x40
+GENERIC = 0
+
+# operand kinds: i int, p packed x/y pair, s string, f number,
+# J the whole params list as json
+SCHEMAS = [
+    (None, None),
+    ("move_to", "ip"),
+    ("turn_left", "i"),
+    ("set_trace", "is"),
+    ("set_speed", "if"),
+    ("add_wall", "ps"),
+    ("remove_wall", "ps"),
+    ("add_object", "psi"),
+    ("update_object", "pi"),
+    ("remove_object", "p"),
+    ("remove_flag", "p"),
+    ("add_msg", "ps"),
+    ("show_message", "sf"),
+    ("set_succes_msg", "s"),
+    ("error", "s"),
+    ("halt", ""),
+    ("draw_all", "J"),
+]
+
+OPCODES = {name: op for op, (name, _) in enumerate(SCHEMAS) if name}
+
+COLUMNS = [
+    ("ops", "B"),
+    ("ints", "i"),
+    ("floats", "d"),
+    ("moves", "i"),
+    ("loads", "i"),
+    ("capacities", "i"),
+    ("baskets", "i"),
+]
+
+# range of the int columns, other ints are recorded as generic json calls
+INT_MIN = -(1 << 31)
+INT_MAX = (1 << 31) - 1
+
+COORD_BITS = 16
+COORD_MASK = (1 << COORD_BITS) - 1
+
+
+def pack_xy(x, y):
+    return (x << COORD_BITS) | y
+
+
+def unpack_xy(val):
+    return [val >> COORD_BITS, val & COORD_MASK]
+
+
+def _is_int(val):
+    return isinstance(val, int) and not isinstance(val, bool)
+
+
+def _fits(schema, params):
+    if schema == "J":
+        return True
+    if len(params) != sum(2 if kind == "p" else 1 for kind in schema):
+        return False
+    i = 0
+    for kind in schema:
+        if kind == "p":
+            x, y = params[i:i + 2]
+            if not (_is_int(x) and _is_int(y) and 0 <= x < 1 << 15 and
+                    0 <= y <= COORD_MASK):
+                return False
+            i += 2
+            continue
+        val = params[i]
+        if kind == "i" and not (_is_int(val) and INT_MIN <= val <= INT_MAX):
+            return False
+        if kind == "s" and not isinstance(val, str):
+            return False
+        if kind == "f" and (isinstance(val, bool) or
+                            not isinstance(val, (int, float))):
+            return False
+        i += 1
+    return True
+
+
+class TraceRecorder():
+    """Records the frontend calls of one run.
+
+    Examples
+    --------
+    >>> recorder = TraceRecorder()
+    >>> maze = Maze(world, recorder=recorder)
+    >>> # or maze.events.subscribe(recorder.record_event)
+    >>> ...
+    >>> recorder.save("run.ottr")
+    """
+
+    def __init__(self, ui_id=None):
+        self.ui_id = ui_id
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self.strings = []
+        self.string_index = {}
+        self.last_stats = None
+
+    def __len__(self):
+        return len(self.columns["ops"])
+
+    def string_ref(self, val):
+        ref = self.string_index.get(val, None)
+        if ref is None:
+            ref = len(self.strings)
+            self.strings.append(val)
+            self.string_index[val] = ref
+        return ref
+
+    def record_event(self, event):
+        """Event bus sink."""
+        self.record(event.data)
+
+    def record(self, data):
+        """Records one call as sent to the frontend."""
+        if self.ui_id is None:
+            self.ui_id = data.get("ui_id", None)
+
+        method_name = data["method_name"]
+        params = data.get("params", [])
+        op = OPCODES.get(method_name, GENERIC)
+        if op != GENERIC and not _fits(SCHEMAS[op][1], params):
+            op = GENERIC
+
+        ints = self.columns["ints"]
+        floats = self.columns["floats"]
+        if op == GENERIC:
+            ints.append(self.string_ref(method_name))
+            ints.append(self.string_ref(json.dumps(params)))
+        elif SCHEMAS[op][1] == "J":
+            ints.append(self.string_ref(json.dumps(params)))
+        else:
+            i = 0
+            for kind in SCHEMAS[op][1]:
+                if kind == "p":
+                    ints.append(pack_xy(params[i], params[i + 1]))
+                    i += 2
+                    continue
+                if kind == "i":
+                    ints.append(params[i])
+                elif kind == "s":
+                    ints.append(self.string_ref(params[i]))
+                else:
+                    floats.append(params[i])
+                i += 1
+
+        stats = data.get("stats", None)
+        if stats is not None:
+            op |= HAS_STATS
+            capacity = stats.get("max_capacity", None)
+            row = (stats.get("total_moves", 0), stats.get("current_load", 0),
+                   -1 if capacity is None else capacity,
+                   json.dumps(stats.get("basket", [])))
+            if row == self.last_stats:
+                op |= SAME_STATS
+            else:
+                self.columns["moves"].append(row[0])
+                self.columns["loads"].append(row[1])
+                self.columns["capacities"].append(row[2])
+                self.columns["baskets"].append(self.string_ref(row[3]))
+                self.last_stats = row
+        self.columns["ops"].append(op)
+
+    def to_bytes(self, compress=True):
+        header = {
+            "ui_id": self.ui_id,
+            "strings": self.strings,
+            "columns": [[name, len(self.columns[name])] for name, _ in COLUMNS],
+        }
+        header = json.dumps(header, separators=(',', ':')).encode("utf-8")
+        parts = [struct.pack("<I", len(header)), header]
+        for name, _ in COLUMNS:
+            parts.append(_to_le(self.columns[name]).tobytes())
+        body = b"".join(parts)
+
+        flags = 0
+        if compress:
+            body = zlib.compress(body, 6)
+            flags |= FLAG_COMPRESSED
+        return MAGIC + bytes([VERSION, flags]) + body
+
+    def save(self, path, compress=True):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes(compress))
+
+
+class TraceReader():
+    """Decodes a trace written by `TraceRecorder`."""
+
+    def __init__(self, raw):
+        if raw[:4] != MAGIC:
+            raise ValueError("Not an ottopy trace")
+        if raw[4] != VERSION:
+            raise ValueError("Unsupported trace version {}".format(raw[4]))
+
+        body = raw[6:]
+        if raw[5] & FLAG_COMPRESSED:
+            body = zlib.decompress(body)
+
+        (size,) = struct.unpack_from("<I", body)
+        header = json.loads(body[4:4 + size].decode("utf-8"))
+        self.ui_id = header["ui_id"]
+        self.strings = header["strings"]
+        self.columns = {}
+
+        offset = 4 + size
+        typecodes = dict(COLUMNS)
+        for name, count in header["columns"]:
+            column = array(typecodes[name])
+            end = offset + count * column.itemsize
+            column.frombytes(body[offset:end])
+            self.columns[name] = _to_le(column)
+            offset = end
+
+    def __len__(self):
+        return len(self.columns["ops"])
+
+    def events(self):
+        """Yields the recorded calls in order."""
+        strings = self.strings
+        ints = iter(self.columns["ints"])
+        floats = iter(self.columns["floats"])
+        stats = zip(self.columns["moves"], self.columns["loads"],
+                    self.columns["capacities"], self.columns["baskets"])
+
+        row = None
+        for op in self.columns["ops"]:
+            code = op & ~(HAS_STATS | SAME_STATS)
+            if code == GENERIC:
+                method_name = strings[next(ints)]
+                params = json.loads(strings[next(ints)])
+            else:
+                method_name, schema = SCHEMAS[code]
+                if schema == "J":
+                    params = json.loads(strings[next(ints)])
+                else:
+                    params = []
+                    for kind in schema:
+                        if kind == "p":
+                            params.extend(unpack_xy(next(ints)))
+                        elif kind == "i":
+                            params.append(next(ints))
+                        elif kind == "s":
+                            params.append(strings[next(ints)])
+                        else:
+                            params.append(next(floats))
+
+            event = {"method_name": method_name, "params": params,
+                     "ui_id": self.ui_id}
+            if op & HAS_STATS:
+                if not op & SAME_STATS:
+                    row = next(stats)
+                moves, load, capacity, basket = row
+                event["stats"] = {
+                    "max_capacity": None if capacity < 0 else capacity,
+                    "current_load": load,
+                    "total_moves": moves,
+                    "basket": json.loads(strings[basket]),
+                }
+            yield event
+
+
+def load_trace(path):
+    """Streams the calls stored in a trace file.
+
+    Examples
+    --------
+    >>> for event in load_trace("run.ottr"):
+    ...     print(event["method_name"], event["params"])
+    """
+    with open(path, "rb") as f:
+        reader = TraceReader(f.read())
+    return reader.events()
+
+
+def _to_le(column):
+    # columns are stored little endian whatever the host byte order is
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Indresh Vishwakarma.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Variant sweeps of randomized worlds.
+
+`WorldParser` draws dimensions, object counts, initial and final positions
+through choice points (``choice`` over a list, ``randint`` over an ``"a-b"``
+range). A variant is the list of option indices taken at those points. Small
+worlds are enumerated exhaustively; when the product of the choice points is
+larger than `max_variants`, a stratified sample is taken so every option of
+every choice point is covered as evenly as possible. Variants are plain dicts
+(``index``, ``seed``, ``choices``) and rebuild the same world every time.
+
+Command line::
+
+    python -m ottopy.variants level1 solution.py -j 8
+"""
+
+import argparse
+import functools
+import json
+import operator
+import random
+import sys
+
+from .grader import (DEFAULT_MAX_INSTRUCTIONS, DEFAULT_TIMEOUT, level_path,
+                     load_config, run_jobs)
+from .models.world_model import WorldModel
+from .models.world_parser import VariantRandom, WorldParser
+
+DEFAULT_MAX_VARIANTS = 1000
+
+
+def choice_arities(config):
+    """Returns the number of options of each choice point of a level."""
+    rng = VariantRandom()
+    WorldParser.parse(WorldModel(), config, rng)
+    return rng.arities
+
+
+def variants(config, max_variants=DEFAULT_MAX_VARIANTS, seed=0):
+    """Lists the variants of a level config.
+
+    Returns every variant when there are at most `max_variants` of them,
+    a stratified sample of `max_variants` variants otherwise.
+    """
+    arities = choice_arities(config)
+    total = functools.reduce(operator.mul, arities, 1)
+    if total <= max_variants:
+        chosen = [mixed_radix(index, arities) for index in range(total)]
+    else:
+        chosen = stratified(arities, max_variants, seed)
+
+    return [{"index": index, "seed": seed + index, "choices": choices}
+            for index, choices in enumerate(chosen)]
+
+
+def mixed_radix(index, arities):
+    choices = []
+    for n in reversed(arities):
+        index, digit = divmod(index, n)
+        choices.append(digit)
+    return choices[::-1]
+
+
+def stratified(arities, n, seed=0):
+    # latin hypercube over the choice points: each point splits the n samples
+    # into equal strata, one per option, shuffled independently per point
+    columns = []
+    for point, arity in enumerate(arities):
+        order = list(range(n))
+        random.Random("{}:{}".format(seed, point)).shuffle(order)
+        columns.append([(k * arity) // n for k in order])
+    return [list(row) for row in zip(*columns)] if columns else [[]] * n
+
+
+def build_variant(path, variant, options={}):
+    """Builds the world of one variant of the level at `path`."""
+    world = WorldModel(None, None, options)
+    rng = VariantRandom(variant["seed"], variant["choices"])
+    WorldParser.parse(world, load_config(path), rng)
+    return world
+
+
+def sweep(level, program, max_variants=DEFAULT_MAX_VARIANTS, seed=0,
+          processes=None, timeout=DEFAULT_TIMEOUT,
+          max_instructions=DEFAULT_MAX_INSTRUCTIONS, worlds_dir="worlds"):
+    """Runs `program` against the variants of `level` in a process pool.
+
+    Returns
+    -------
+    dict
+        the number of variants of the level, whether the sweep was
+        exhaustive, the results of the failing variants and all results.
+
+    Examples
+    --------
+    >>> report = sweep("level1", "solution.py")
+    >>> [r["variant"]["choices"] for r in report["failed"]]
+    [[2, 0], [3, 1]]
+    """
+    path = level_path(level, worlds_dir)
+    config = load_config(path)
+    total = functools.reduce(operator.mul, choice_arities(config), 1)
+    jobs = [{"level": path, "program": program, "timeout": timeout,
+             "max_instructions": max_instructions, "variant": variant}
+            for variant in variants(config, max_variants, seed)]
+    results = run_jobs(jobs, processes)
+
+    return {
+        "level": path,
+        "program": program,
+        "variants": total,
+        "exhaustive": total <= max_variants,
+        "tested": len(results),
+        "failed": [r for r in results if not r["passed"]],
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="ottopy-sweep",
+        description="Run a program against every variant of a level.")
+    parser.add_argument("level", help="level name or path of a level json file")
+    parser.add_argument("program", help="python file to run")
+    parser.add_argument("-j", "--processes", type=int, default=None)
+    parser.add_argument("--max-variants", type=int,
+                        default=DEFAULT_MAX_VARIANTS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--worlds-dir", default="worlds")
+    args = parser.parse_args(argv)
+
+    report = sweep(args.level, args.program, args.max_variants, args.seed,
+                   processes=args.processes, timeout=args.timeout,
+                   worlds_dir=args.worlds_dir)
+    del report["results"]
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -83,14 +83,12 @@ setup_args = dict(
         'License :: OSI Approved :: BSD License',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
         'Framework :: Jupyter',
     ],
     include_package_data = True,
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     install_requires = [
         'ipywidgets>=7.0.0',
     ],
@@ -115,6 +113,11 @@ setup_args = dict(
         ],
     },
     entry_points = {
+        'console_scripts': [
+            'ottopy-grade = ottopy.grader:main',
+            'ottopy-sweep = ottopy.variants:main',
+            'ottopy-lint = ottopy.linter:main',
+        ],
     },
 )
 
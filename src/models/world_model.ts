@@ -8,8 +8,6 @@ import _padStart from 'lodash/padStart';
 import draggable from '../utils/draggable';
 
 const MIN_BOX_SIZE = 23;
-const MAX_ROWS = 15;
-const MAX_COLS = 15;
 const LEFT_PADDING = 50;
 export const NUMBER_PADDING = 30;
 export const IMAGE_PADDING = 3;
@@ -39,6 +37,22 @@ type WorldConfig = {
   border_color: string;
   grid_line_color: string;
   floating: boolean;
+  // set for large worlds which are sent chunk by chunk
+  chunk_size?: number;
+  viewport?: number[];
+};
+
+type Chunk = {
+  x: number;
+  y: number;
+  w: number;
+  h: number;
+  vwalls: any;
+  hwalls: any;
+  tiles: any;
+  objects: any;
+  messages: any;
+  flags: any;
 };
 export class WorldModel {
   config: WorldConfig;
@@ -78,10 +92,17 @@ export class WorldModel {
   };
   current_run: JQuery<HTMLElement>;
   onZoomChange: Function;
+  onRequestChunks: Function;
+  loaded_chunks: Set<string>;
   zoom_level: number;
 
-  constructor(zoom_level: number, onZoomChange: Function) {
+  constructor(
+    zoom_level: number,
+    onZoomChange: Function,
+    onRequestChunks: Function = () => null
+  ) {
     this.onZoomChange = onZoomChange;
+    this.onRequestChunks = onRequestChunks;
     this.zoom_level = zoom_level;
   }
 
@@ -90,12 +111,12 @@ export class WorldModel {
     ui_id: string,
     rows: number,
     cols: number,
-    vwalls = [],
-    hwalls = [],
+    vwalls: any = {},
+    hwalls: any = {},
     robots = [],
     objects = {},
     tileMap = {},
-    tiles = [],
+    tiles: any = {},
     messages = {},
     flags = {},
     pending_goals = [],
@@ -113,11 +134,13 @@ export class WorldModel {
         )
     );
     this.draggable = false;
-    this.rows = Math.min(MAX_ROWS, rows);
-    this.cols = Math.min(MAX_COLS, cols);
+    this.config = config;
+    // the kernel moves robots and sends features over the whole world,
+    // dense worlds are drawn in full and chunked ones block by block
+    this.rows = rows;
+    this.cols = cols;
     this.vwalls = vwalls;
     this.hwalls = hwalls;
-    this.config = config;
     this.ui_id = ui_id;
     let screen_height = $(window).height() || DEFAULT_HEIGHT;
     let grid_height = Math.max(screen_height * 0.6, MIN_HEIGHT);
@@ -262,12 +285,25 @@ export class WorldModel {
     `;
   }
 
+  chunked() {
+    return !!(this.config && this.config.chunk_size);
+  }
+
   draw_canvas() {
     try {
+      let width = this.width;
+      let height = this.height;
+      if (this.chunked()) {
+        // the stage only covers the viewport, it follows the scroll bars
+        let [, , w, h] = this.config.viewport || [0, 0, 0, 0];
+        width = Math.min(width, w * this.bs);
+        height = Math.min(height, h * this.bs);
+        this.init_scroll_area();
+      }
       let stage = new Konva.Stage({
         container: '.konva-grid',
-        width: this.width + NUMBER_PADDING,
-        height: this.height + NUMBER_PADDING,
+        width: width + NUMBER_PADDING,
+        height: height + NUMBER_PADDING,
       });
 
       this.ui = {
@@ -293,6 +329,9 @@ export class WorldModel {
       this.draw_envelops();
       this.draw_flags();
       this.draw_drop_goals(this.drop_goals);
+      if (this.chunked()) {
+        this.scroll_to_viewport();
+      }
       return this.ui.layers.main.draw();
     } catch (error) {
       console.log(
@@ -572,12 +611,155 @@ export class WorldModel {
   }
 
   draw_grid() {
-    this.draw_cols();
-    this.draw_rows();
+    if (this.chunked()) {
+      let [x0, y0, w, h] = this.config.viewport || [1, 1, 0, 0];
+      this.draw_chunk_lines(x0, y0, w, h);
+    } else {
+      this.draw_cols();
+      this.draw_rows();
+    }
     this.draw_walls();
     this.draw_tiles();
   }
 
+  init_scroll_area() {
+    let $body = $('.konva-body', this.current_run);
+    let $grid = $('.konva-grid', this.current_run);
+    // the large box gives the scroll bars the size of the whole world
+    $grid.wrap(
+      $('<div class="konva-large" />').css({
+        width: this.width + NUMBER_PADDING,
+        height: this.height + NUMBER_PADDING,
+        overflow: 'hidden',
+      })
+    );
+    $grid.css({ margin: 0, padding: 0 });
+    $body.css({ overflow: 'auto', position: 'relative' });
+    $body.on('scroll', () => this.on_scroll());
+  }
+
+  scroll_to_viewport() {
+    let [x0, y0, w, h] = this.config.viewport || [1, 1, 0, 0];
+    this.loaded_chunks = new Set();
+    this.visible_chunks(x0, x0 + w - 1, y0, y0 + h - 1).forEach((chunk) =>
+      this.loaded_chunks.add(chunk.join(','))
+    );
+
+    let $body = $('.konva-body', this.current_run);
+    $body.css({
+      width: this.ui.stage.width(),
+      height: this.ui.stage.height(),
+    });
+    let [cx, cy] = this.point2cxy(x0, y0 + h);
+    $body.scrollLeft(cx).scrollTop(cy);
+    this.on_scroll();
+  }
+
+  on_scroll() {
+    let body = $('.konva-body', this.current_run)[0];
+    if (!body || !this.ui) return;
+    let dx = body.scrollLeft;
+    let dy = body.scrollTop;
+    let transform = `translate(${dx}px, ${dy}px)`;
+    this.ui.stage.container().style.transform = transform;
+    this.ui.stage.x(-dx);
+    this.ui.stage.y(-dy);
+    this.request_visible_chunks(dx, dy, body.clientWidth, body.clientHeight);
+  }
+
+  visible_chunks(x_min: number, x_max: number, y_min: number, y_max: number) {
+    let size = this.config.chunk_size || 1;
+    let chunks: number[][] = [];
+    let first_x = Math.floor((Math.max(x_min, 1) - 1) / size);
+    let first_y = Math.floor((Math.max(y_min, 1) - 1) / size);
+    let last_x = Math.floor((Math.min(x_max, this.cols) - 1) / size);
+    let last_y = Math.floor((Math.min(y_max, this.rows) - 1) / size);
+    for (let cx = first_x; cx <= last_x; cx++) {
+      for (let cy = first_y; cy <= last_y; cy++) {
+        chunks.push([cx, cy]);
+      }
+    }
+    return chunks;
+  }
+
+  request_visible_chunks(dx: number, dy: number, w: number, h: number) {
+    let size = this.config.chunk_size || 1;
+    // canvas y grows downwards, world y upwards
+    let x_min = Math.floor(dx / this.bs) + 1;
+    let x_max = Math.ceil((dx + w) / this.bs);
+    let y_min = Math.floor((this.height - dy - h) / this.bs) + 1;
+    let y_max = Math.ceil((this.height - dy) / this.bs);
+
+    let missing: number[][] = [];
+    this.visible_chunks(x_min, x_max, y_min, y_max).forEach(([cx, cy]) => {
+      let key = `${cx},${cy}`;
+      if (!this.loaded_chunks.has(key)) {
+        this.loaded_chunks.add(key);
+        let x0 = cx * size + 1;
+        let y0 = cy * size + 1;
+        missing.push([
+          x0,
+          y0,
+          Math.min(size, this.cols - x0 + 1),
+          Math.min(size, this.rows - y0 + 1),
+        ]);
+      }
+    });
+
+    if (missing.length) {
+      this.onRequestChunks(missing);
+    }
+  }
+
+  draw_chunk(chunk: Chunk) {
+    if (!this.ui) return;
+    this.draw_chunk_lines(chunk.x, chunk.y, chunk.w, chunk.h);
+    this.draw_sparse_walls(chunk.hwalls, 'north');
+    this.draw_sparse_walls(chunk.vwalls, 'east');
+    Object.assign(this.tiles, chunk.tiles);
+    this.draw_sparse_tiles(chunk.tiles);
+
+    Object.assign(this.objects, chunk.objects);
+    for (const key in chunk.objects) {
+      const [x, y] = key.split(',').map((zz) => parseInt(zz));
+      this.draw_object(x, y, chunk.objects[key]);
+    }
+    Object.assign(this.messages, chunk.messages);
+    for (const key in chunk.messages) {
+      const [x, y] = key.split(',').map((zz) => parseInt(zz));
+      this.draw_envelop(x, y, chunk.messages[key]);
+    }
+    Object.assign(this.flags, chunk.flags);
+    for (const key in chunk.flags) {
+      const [x, y] = key.split(',').map((zz) => parseInt(zz));
+      this.draw_flag(x, y);
+    }
+    this.ui.layers.main.batchDraw();
+  }
+
+  draw_chunk_lines(x0: number, y0: number, w: number, h: number) {
+    let [left, top] = this.point2cxy(x0, y0 + h);
+    let [right, bottom] = this.point2cxy(x0 + w, y0);
+    for (let col = Math.max(x0, 2); col < x0 + w; col++) {
+      let [cx] = this.point2cxy(col, y0);
+      this.ui.layers.main.add(
+        new Konva.Line({
+          stroke: this.config.grid_line_color,
+          points: [cx, top, cx, bottom],
+        })
+      );
+    }
+    for (let row = Math.max(y0, 2); row < y0 + h; row++) {
+      let [, cy] = this.point2cxy(x0, row);
+      this.ui.layers.main.add(
+        new Konva.Line({
+          stroke: this.config.grid_line_color,
+          points: [left, cy, right, cy],
+        })
+      );
+    }
+  }
+
   _draw_tile(x: number, y: number, tile: string) {
     let [cx, cy] = this.point2cxy(x, y + 1);
     let imagePath = this.tileMap[tile];
@@ -594,7 +776,19 @@ export class WorldModel {
     });
   }
 
+  draw_sparse_tiles(tiles: any) {
+    Object.keys(tiles).forEach((key: string) => {
+      let [x, y] = key.split(',').map((v) => parseInt(v));
+      this._draw_tile(x, y, tiles[key]);
+    });
+  }
+
   draw_tiles() {
+    if (!Array.isArray(this.tiles)) {
+      // sparse: {"x,y": tile} for the cells that have a background
+      this.draw_sparse_tiles(this.tiles);
+      return;
+    }
     this.tiles.forEach((list: any, row: number) => {
       list.forEach((tile: any, col: number) => {
         if (!!tile) {
@@ -717,7 +911,20 @@ export class WorldModel {
     }
   }
 
+  draw_sparse_walls(walls: any, dir: string) {
+    Object.keys(walls).forEach((key: string) => {
+      let [x, y] = key.split(',').map((v) => parseInt(v));
+      this.draw_typed_wall(x, y, dir, walls[key]);
+    });
+  }
+
   draw_walls() {
+    if (!Array.isArray(this.hwalls)) {
+      // sparse: {"x,y": WallType} for the walls that are set
+      this.draw_sparse_walls(this.hwalls, 'north');
+      this.draw_sparse_walls(this.vwalls, 'east');
+      return;
+    }
     this.hwalls.forEach((hw: any, i: number) => {
       hw.forEach((val: number, j: number) => {
         if (val) {
@@ -19,6 +19,14 @@ const queue = new PQueue({ concurrency: 1 });
 //Allowed method without valid maze
 const ALLOWED_METHOD = ['halt', 'draw_all'];
 
+type MethodCall = {
+  method_name: string;
+  params: any;
+  cb: any;
+  stats?: any;
+  ui_id: string;
+};
+
 export class MazeModel extends DOMWidgetModel {
   defaults() {
     return {
@@ -54,14 +62,19 @@ export class MazeView extends DOMWidgetView {
   world_model: WorldModel;
 
   method_changed = () => {
-    let current_call: {
-      method_name: string;
-      params: any;
-      cb: any;
-      stats?: any;
-      ui_id: string;
-    } = JSON.parse(this.model.get('current_call'));
+    let payload: MethodCall | MethodCall[] = JSON.parse(
+      this.model.get('current_call')
+    );
+
+    // batched frames carry an array of calls which are replayed in order,
+    // only the last call of a frame writes back `method_return`
+    let calls = Array.isArray(payload) ? payload : [payload];
+    calls.forEach((current_call, i) => {
+      this.enqueue_call(current_call, i === calls.length - 1);
+    });
+  };
 
+  enqueue_call = (current_call: MethodCall, ack: boolean) => {
     console.log(
       `#${current_call.ui_id} need to call current_method: ${current_call.method_name}`
     );
@@ -77,14 +90,19 @@ export class MazeView extends DOMWidgetView {
     } else {
       queue.add(() => {
         return new Promise((resolve) => {
-          let ret =
-            typeof this[current_call.method_name as keyof MazeView] ===
-            'function'
-              ? this[current_call.method_name as keyof MazeView].apply(
-                  this,
-                  current_call.params
-                )
-              : null;
+          let ret: any;
+          try {
+            ret =
+              typeof this[current_call.method_name as keyof MazeView] ===
+              'function'
+                ? this[current_call.method_name as keyof MazeView].apply(
+                    this,
+                    current_call.params
+                  )
+                : null;
+          } catch (err) {
+            ret = Promise.reject(err);
+          }
 
           if (
             !ALLOWED_METHOD.some((e) => e === current_call.method_name) &&
@@ -96,6 +114,9 @@ export class MazeView extends DOMWidgetView {
               current_call.method_name,
               current_call.method_name in ALLOWED_METHOD
             );
+            if (ack) {
+              this.send_return(current_call, null);
+            }
             return resolve(null);
           }
 
@@ -103,19 +124,12 @@ export class MazeView extends DOMWidgetView {
           let that = this;
           Promise.resolve(ret)
             .then(function (x) {
+              if (!ack) {
+                return x;
+              }
               // console.log("reached in promise");
-              let data = JSON.stringify({
-                value: x,
-                cb: +new Date(),
-                params: current_call.params,
-                method: current_call.method_name,
-              });
-              console.log('setting return', data);
-              that.model.set('method_return', data);
-              that.model.save_changes();
-              return data;
+              return that.send_return(current_call, x);
             })
-            .then(resolve)
             .catch((err) => {
               console.log(
                 'error =>',
@@ -123,19 +137,41 @@ export class MazeView extends DOMWidgetView {
                 'execution failed',
                 err
               );
-            });
+              // a failed call is acked too, or the kernel would wait for
+              // it until its ack timeout
+              if (ack) {
+                return that.send_return(current_call, null, String(err));
+              }
+            })
+            .then(resolve);
         });
       });
     }
   };
 
+  // acks a frame, the kernel releases its flow control credit on `cb`
+  send_return = (current_call: MethodCall, value: any, error?: string) => {
+    let data = JSON.stringify({
+      value: value,
+      cb: current_call.cb,
+      ts: +new Date(),
+      params: current_call.params,
+      method: current_call.method_name,
+      error: error || null,
+    });
+    console.log('setting return', data);
+    this.model.set('method_return', data);
+    this.model.save_changes();
+    return data;
+  };
+
   draw_all = (
     world_config: any,
     ui_id: string,
     rows: number,
     cols: number,
-    vwalls: [],
-    hwalls: [],
+    vwalls: any = {},
+    hwalls: any = {},
     robots = [],
     objects: any = {},
     tileMap: any = {},
@@ -281,6 +317,19 @@ export class MazeView extends DOMWidgetView {
     return this.world_model.read_message(msg, waitFor);
   };
 
+  // chunked worlds: blocks of cells are fetched from the kernel on pan
+  request_chunks(chunks: number[][]) {
+    this.send({ event: 'request_chunks', chunks: chunks });
+  }
+
+  on_custom_msg(content: any) {
+    if (content.event === 'draw_chunks' && this.world_model) {
+      content.chunks.forEach((chunk: any) =>
+        this.world_model.draw_chunk(chunk)
+      );
+    }
+  }
+
   handle_zoom_level(zoom_level: number) {
     this.model.set('zoom', zoom_level);
     this.model.save_changes();
@@ -295,11 +344,13 @@ export class MazeView extends DOMWidgetView {
   render() {
     this.method_changed();
     this.listenTo(this.model, 'change:current_call', this.method_changed);
+    this.listenTo(this.model, 'msg:custom', this.on_custom_msg);
 
     if (!this.world_model) {
       this.world_model = new WorldModel(
         this.model.get('zoom') || 1,
-        this.handle_zoom_level.bind(this)
+        this.handle_zoom_level.bind(this),
+        this.request_chunks.bind(this)
       );
     }
     this.initOutput();
@@ -308,6 +359,11 @@ export class MazeView extends DOMWidgetView {
     if (!this.model.get('is_inited')) {
       this.setInited();
     }
+    // reports the first call this view found, the kernel draws the world
+    // again for views rendered after its first calls
+    let payload = JSON.parse(this.model.get('current_call'));
+    let first = Array.isArray(payload) ? payload[0] : payload;
+    this.send({ event: 'ready', cb: first && first.cb ? first.cb : null });
   }
 
   initOutput() {